@@ -28,10 +28,15 @@ THE SOFTWARE.
 
 /*
  * I2S control
+ *
+ * WIDTH is the slot width in bits.  ws is low for slot 0 and high for the
+ * remaining slots, so SLOTS = 2 is standard I2S and SLOTS > 2 is TDM with
+ * a frame sync falling edge at the start of each frame.
  */
 module i2s_ctrl #
 (
-    parameter WIDTH = 16
+    parameter WIDTH = 16,
+    parameter SLOTS = 2
 )
 (
     input  wire              clk,
@@ -51,6 +56,7 @@ module i2s_ctrl #
 
 reg [15:0] prescale_cnt = 0;
 reg [$clog2(WIDTH)-1:0] ws_cnt = 0;
+reg [$clog2(SLOTS)-1:0] slot_cnt = 0;
 
 reg sck_reg = 0;
 reg ws_reg = 0;
@@ -62,6 +68,7 @@ always @(posedge clk) begin
     if (rst) begin
         prescale_cnt <= 0;
         ws_cnt <= 0;
+        slot_cnt <= 0;
         sck_reg <= 0;
         ws_reg <= 0;
     end else begin
@@ -75,7 +82,13 @@ always @(posedge clk) begin
                     ws_cnt <= ws_cnt - 1;
                 end else begin
                     ws_cnt <= WIDTH-1;
-                    ws_reg <= ~ws_reg;
+                    if (slot_cnt == SLOTS-1) begin
+                        slot_cnt <= 0;
+                        ws_reg <= 0;
+                    end else begin
+                        slot_cnt <= slot_cnt + 1;
+                        ws_reg <= 1;
+                    end
                 end
             end else begin
                 sck_reg <= 1;
@@ -28,64 +28,73 @@ THE SOFTWARE.
 
 /*
  * I2S RX
+ *
+ * Slot n of the frame is output_tdata[n*WIDTH +: WIDTH], and slots 0 and 1
+ * are also output on output_l_tdata and output_r_tdata.  Slots 0 and 1 start
+ * on the ws edges; with SLOTS > 2 (TDM) the following slots are counted out
+ * in SLOT_WIDTH bit clocks after slot 1.
  */
 module i2s_rx #
 (
-    parameter WIDTH = 16
+    parameter WIDTH = 16,
+    parameter SLOTS = 2,
+    parameter SLOT_WIDTH = WIDTH
 )
 (
-    input  wire              clk,
-    input  wire              rst,
+    input  wire                    clk,
+    input  wire                    rst,
 
     /*
      * I2S interface
      */
-    input  wire              sck,
-    input  wire              ws,
-    input  wire              sd,
+    input  wire                    sck,
+    input  wire                    ws,
+    input  wire                    sd,
 
     /*
      * AXI stream output
      */
-    output wire [WIDTH-1:0]  output_l_tdata,
-    output wire [WIDTH-1:0]  output_r_tdata,
-    output wire              output_tvalid,
-    input  wire              output_tready
+    output wire [WIDTH-1:0]        output_l_tdata,
+    output wire [WIDTH-1:0]        output_r_tdata,
+    output wire [SLOTS*WIDTH-1:0]  output_tdata,
+    output wire                    output_tvalid,
+    input  wire                    output_tready
 );
 
-reg [WIDTH-1:0] l_data_reg = 0;
-reg [WIDTH-1:0] r_data_reg = 0;
+reg [SLOTS*WIDTH-1:0] data_reg = 0;
 
-reg l_data_valid_reg = 0;
-reg r_data_valid_reg = 0;
+reg [SLOTS-1:0] data_valid_reg = 0;
 
 reg [WIDTH-1:0] sreg = 0;
 
 reg [$clog2(WIDTH)-1:0] bit_cnt = 0;
 
+reg [$clog2(SLOTS)-1:0] slot_cnt = 0;
+reg [$clog2(SLOT_WIDTH)-1:0] slot_bit_cnt = 0;
+
 reg last_sck = 0;
 reg last_ws = 0;
 reg last_ws2 = 0;
 
-assign output_l_tdata = l_data_reg;
-assign output_r_tdata = r_data_reg;
-assign output_tvalid = l_data_valid_reg & r_data_valid_reg;
+assign output_l_tdata = data_reg[0 +: WIDTH];
+assign output_r_tdata = data_reg[WIDTH +: WIDTH];
+assign output_tdata = data_reg;
+assign output_tvalid = &data_valid_reg;
 
 always @(posedge clk) begin
     if (rst) begin
-        l_data_reg <= 0;
-        r_data_reg <= 0;
-        l_data_valid_reg <= 0;
-        r_data_valid_reg <= 0;
+        data_reg <= 0;
+        data_valid_reg <= 0;
         sreg <= 0;
         bit_cnt <= 0;
+        slot_cnt <= 0;
+        slot_bit_cnt <= 0;
         last_sck <= 0;
         last_ws <= 0;
         last_ws2 <= 0;
     end else begin
         if (output_tready & output_tvalid) begin
-            l_data_valid_reg <= 0;
-            r_data_valid_reg <= 0;
+            data_valid_reg <= 0;
         end
 
         last_sck <= sck;
@@ -96,19 +105,33 @@ always @(posedge clk) begin
             last_ws2 <= last_ws;
 
             if (last_ws2 != last_ws) begin
+                // start of slot 0 or slot 1
+                bit_cnt <= WIDTH-1;
+                slot_cnt <= last_ws;
+                slot_bit_cnt <= SLOT_WIDTH-1;
+                sreg <= {{WIDTH-1{1'b0}}, sd};
+            end else if (slot_bit_cnt == 0 && slot_cnt > 0 && slot_cnt < SLOTS-1) begin
+                // start of TDM slot
                 bit_cnt <= WIDTH-1;
+                slot_cnt <= slot_cnt + 1;
+                slot_bit_cnt <= SLOT_WIDTH-1;
                 sreg <= {{WIDTH-1{1'b0}}, sd};
             end else begin
+                if (slot_bit_cnt > 0) begin
+                    slot_bit_cnt <= slot_bit_cnt - 1;
+                end
                 if (bit_cnt > 0) begin
                     bit_cnt <= bit_cnt - 1;
                     if (bit_cnt > 1) begin
                         sreg <= {sreg[WIDTH-2:0], sd};
-                    end else if (last_ws2) begin
-                        r_data_reg <= {sreg[WIDTH-2:0], sd};
-                        r_data_valid_reg <= l_data_valid_reg;
                     end else begin
-                        l_data_reg <= {sreg[WIDTH-2:0], sd};
-                        l_data_valid_reg <= 1;
+                        data_reg[slot_cnt*WIDTH +: WIDTH] <= {sreg[WIDTH-2:0], sd};
+                        // frame is valid once every slot since slot 0 arrived
+                        if (slot_cnt == 0) begin
+                            data_valid_reg[0] <= 1;
+                        end else begin
+                            data_valid_reg[slot_cnt] <= data_valid_reg[slot_cnt-1];
+                        end
                     end
                 end
             end
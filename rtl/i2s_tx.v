@@ -28,66 +28,77 @@ THE SOFTWARE.
 
 /*
  * I2S TX
+ *
+ * With SLOTS = 2 the frame is taken from input_l_tdata and input_r_tdata and
+ * input_tdata is not used; with SLOTS > 2 (TDM) slot n of the frame is
+ * input_tdata[n*WIDTH +: WIDTH].  Slots 0 and 1 start on the ws edges, the
+ * following slots are counted out in SLOT_WIDTH bit clocks after slot 1.
  */
 module i2s_tx #
 (
-    parameter WIDTH = 16
+    parameter WIDTH = 16,
+    parameter SLOTS = 2,
+    parameter SLOT_WIDTH = WIDTH
 )
 (
-    input  wire              clk,
-    input  wire              rst,
+    input  wire                    clk,
+    input  wire                    rst,
 
     /*
      * AXI stream input
      */
-    input  wire [WIDTH-1:0]  input_l_tdata,
-    input  wire [WIDTH-1:0]  input_r_tdata,
-    input  wire              input_tvalid,
-    output wire              input_tready,
+    input  wire [WIDTH-1:0]        input_l_tdata,
+    input  wire [WIDTH-1:0]        input_r_tdata,
+    input  wire [SLOTS*WIDTH-1:0]  input_tdata,
+    input  wire                    input_tvalid,
+    output wire                    input_tready,
 
     /*
      * I2S interface
      */
-    input  wire              sck,
-    input  wire              ws,
-    output wire              sd
+    input  wire                    sck,
+    input  wire                    ws,
+    output wire                    sd
 );
 
-reg [WIDTH-1:0] l_data_reg = 0;
-reg [WIDTH-1:0] r_data_reg = 0;
+wire [SLOTS*WIDTH-1:0] frame_tdata = SLOTS == 2 ? {input_r_tdata, input_l_tdata} : input_tdata;
 
-reg l_data_valid_reg = 0;
-reg r_data_valid_reg = 0;
+reg [SLOTS*WIDTH-1:0] data_reg = 0;
+reg [SLOTS*WIDTH-1:0] frame_reg = 0;
+
+reg data_valid_reg = 0;
 
 reg [WIDTH-1:0] sreg = 0;
 
 reg [$clog2(WIDTH+1)-1:0] bit_cnt = 0;
 
+reg [$clog2(SLOTS)-1:0] slot_cnt = 0;
+reg [$clog2(SLOT_WIDTH)-1:0] slot_bit_cnt = 0;
+
 reg last_sck = 0;
 reg last_ws = 0;
 reg sd_reg = 0;
 
-assign input_tready = ~l_data_valid_reg & ~r_data_valid_reg;
+assign input_tready = ~data_valid_reg;
 
 assign sd = sd_reg;
 
 always @(posedge clk) begin
     if (rst) begin
-        l_data_reg <= 0;
-        r_data_reg <= 0;
-        l_data_valid_reg <= 0;
-        r_data_valid_reg <= 0;
+        data_reg <= 0;
+        frame_reg <= 0;
+        data_valid_reg <= 0;
         sreg <= 0;
         bit_cnt <= 0;
+        slot_cnt <= 0;
+        slot_bit_cnt <= 0;
         last_sck <= 0;
         last_ws <= 0;
         sd_reg <= 0;
     end else begin
         if (input_tready & input_tvalid) begin
-            l_data_reg <= input_l_tdata;
-            r_data_reg <= input_r_tdata;
-            l_data_valid_reg <= 1;
-            r_data_valid_reg <= 1;
+            data_reg <= frame_tdata;
+            data_valid_reg <= 1;
         end
 
         last_sck <= sck;
@@ -97,14 +108,29 @@ always @(posedge clk) begin
             last_ws <= ws;
 
             if (last_ws != ws) begin
+                // start of slot 0 or slot 1
                 bit_cnt <= WIDTH;
+                slot_cnt <= ws;
+                slot_bit_cnt <= SLOT_WIDTH-1;
                 if (ws) begin
-                    sreg <= r_data_reg;
-                    r_data_valid_reg <= 0;
+                    sreg <= frame_reg[WIDTH +: WIDTH];
                 end else begin
-                    sreg <= l_data_reg;
-                    l_data_valid_reg <= 0;
+                    // latch the whole frame at the start of slot 0 so that
+                    // all slots come from the same input transfer
+                    frame_reg <= data_reg;
+                    sreg <= data_reg[0 +: WIDTH];
+                    if (data_valid_reg) begin
+                        data_valid_reg <= 0;
+                    end
                 end
+            end else if (slot_bit_cnt > 0) begin
+                slot_bit_cnt <= slot_bit_cnt - 1;
+            end else if (slot_cnt > 0 && slot_cnt < SLOTS-1) begin
+                // start of TDM slot
+                bit_cnt <= WIDTH;
+                slot_cnt <= slot_cnt + 1;
+                slot_bit_cnt <= SLOT_WIDTH-1;
+                sreg <= frame_reg[(slot_cnt+1)*WIDTH +: WIDTH];
             end
         end
 
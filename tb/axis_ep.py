@@ -23,11 +23,271 @@ THE SOFTWARE.
 """
 
 from myhdl import *
+from array import array
+from collections import deque, namedtuple
+import itertools
+import logging
+import random
+import zlib
+import numpy as np
+
+import fixed_point
+
+logger = logging.getLogger(__name__)
 
 skip_asserts = False
 
+def _dtype(width):
+    # smallest unsigned dtype that holds width bits, object for wider values
+    for w, t in ((8, np.uint8), (16, np.uint16), (32, np.uint32), (64, np.uint64)):
+        if width <= w:
+            return t
+    return object
+
+def _as_array(data, copy=True):
+    # with copy=False, arrays and buffer protocol objects are wrapped, not duplicated
+    if isinstance(data, np.ndarray):
+        # frozen arrays can't change, so they are shared rather than copied
+        return np.array(data) if copy and not _frozen(data) else data
+    if isinstance(data, (bytes, bytearray)):
+        a = np.frombuffer(data, dtype=np.uint8)
+        return a.copy() if copy else a
+    if isinstance(data, memoryview):
+        return np.array(data) if copy else np.asarray(data)
+    if not isinstance(data, (list, tuple)):
+        data = list(data)
+    return _list_array(data)
+
+def _list_array(data):
+    # NumPy infers float64 for Python ints past the int64 range mixed with
+    # smaller ones; keep them exact as uint64 where they fit, else as objects
+    a = np.array(data)
+    if a.dtype.kind in 'fO' and a.size:
+        o = np.array(data, dtype=object)
+        if all(isinstance(v, (int, np.integer)) for v in o.flat):
+            if o.min() >= 0 and o.max() < 2**64:
+                return o.astype(np.uint64)
+            return o
+    return a
+
+def _is_scalar(x):
+    return isinstance(x, (int, bool, np.integer, np.bool_))
+
+def _sideband(value, copy=True):
+    # per-frame scalars stay as they are, per-beat values become arrays
+    if value is None or _is_scalar(value):
+        return value
+    return _as_array(value, copy)
+
+def _field(value, n):
+    # expand a per-frame field into a per-beat array
+    if value is None:
+        return np.zeros(n, dtype=np.uint64)
+    if _is_scalar(value):
+        return np.full(n, int(value), dtype=_dtype(max(int(value).bit_length(), 64)))
+    return np.asarray(value)[:n]
+
+def _pack(f, M, WL, N):
+    # pack M lanes of WL bits into each tdata word
+    count = (len(f)+M-1) // M
+    pad = count*M - len(f)
+
+    if f.dtype == object or WL > 64:
+        lanes = np.zeros(count*M, dtype=_dtype(WL))
+        lanes[:len(f)] = f.astype(object) & (2**WL-1)
+    else:
+        lanes = np.zeros(count*M, dtype=np.uint64)
+        lanes[:len(f)] = f.astype(np.uint64)
+        if WL < 64:
+            lanes &= np.uint64(2**WL-1)
+    lanes = lanes.reshape(count, M)
+
+    if N <= 64:
+        shifts = np.arange(M, dtype=np.uint64)*np.uint64(WL)
+        tdata = np.bitwise_or.reduce(lanes << shifts, axis=1)
+    elif WL in (8, 16, 32, 64):
+        # lanes are whole bytes, so each beat is a slice of the little endian buffer
+        buf = lanes.astype('<u%d' % (WL // 8)).tobytes()
+        step = M*WL // 8
+        tdata = np.empty(count, dtype=object)
+        tdata[:] = [int.from_bytes(buf[k:k+step], 'little') for k in range(0, len(buf), step)]
+    else:
+        lanes = lanes.astype(object)
+        tdata = lanes[:, 0].copy()
+        for j in range(1, M):
+            tdata |= lanes[:, j] << (j*WL)
+
+    tkeep = np.full(count, 2**M-1, dtype=_dtype(M))
+    if pad:
+        tkeep[-1] = 2**(M-pad)-1
+
+    return tdata, tkeep
+
+def _unpack(tdata, tkeep, M, WL, N):
+    # split tdata words into lanes and keep the lanes enabled in tkeep
+    count = len(tdata)
+
+    if N <= 64:
+        shifts = np.arange(M, dtype=np.uint64)*np.uint64(WL)
+        words = np.asarray(tdata, dtype=np.uint64).reshape(count, 1)
+        lanes = words >> shifts
+        if WL < 64:
+            lanes &= np.uint64(2**WL-1)
+    elif WL in (8, 16, 32, 64):
+        step = M*WL // 8
+        buf = b''.join([int(w).to_bytes(step, 'little') for w in tdata])
+        lanes = np.frombuffer(buf, dtype='<u%d' % (WL // 8)).reshape(count, M)
+    else:
+        shifts = np.arange(M, dtype=object)*WL
+        words = np.asarray(tdata, dtype=object).reshape(count, 1)
+        lanes = (words >> shifts) & (2**WL-1)
+
+    if M <= 64:
+        keep = np.asarray(tkeep, dtype=np.uint64).reshape(count, 1)
+        valid = (keep >> np.arange(M, dtype=np.uint64)) & np.uint64(1) != 0
+    else:
+        keep = np.asarray(tkeep, dtype=object).reshape(count, 1)
+        valid = ((keep >> np.arange(M, dtype=object)) & 1 != 0).astype(bool)
+
+    return lanes[valid].astype(_dtype(WL))
+
+def _key(x):
+    if type(x) is list:
+        return tuple(x)
+    return x
+
+_payload_names = ('data', 'keep', 'id', 'dest', 'user', 'last_cycle_user')
+
+def _payload(name):
+    # payload attribute; assigning it detaches the frame from any cached
+    # build results (which may be shared with copies of the frame), and the
+    # assigned value is not owned by the frame
+    attr = '_' + name
+
+    def get(self):
+        return getattr(self, attr)
+
+    def set(self, value):
+        setattr(self, attr, value)
+        self._cache = {}
+        self._own.discard(name)
+
+    return property(get, set)
+
+def _frozen(value):
+    return isinstance(value, np.ndarray) and value.flags.owndata and not value.flags.writeable
+
+def _freeze(value):
+    # owned arrays are made read-only once built or copied, so in-place
+    # edits raise instead of sending stale cached build results
+    if isinstance(value, np.ndarray) and value.flags.owndata:
+        value.setflags(write=False)
+
+def _snapshot(value):
+    # a cached build result depends on the value itself, and on its contents
+    # if it can still be modified in place
+    if isinstance(value, bytearray):
+        return value, bytes(value)
+    if isinstance(value, np.ndarray) and not _frozen(value):
+        return value, value.copy()
+    return value, None
+
+def _unchanged(value, snapshot):
+    obj, contents = snapshot
+    if contents is None:
+        return value is obj
+    if isinstance(contents, bytes):
+        return isinstance(value, bytearray) and value == contents
+    return (isinstance(value, np.ndarray) and value.dtype == contents.dtype and
+        value.shape == contents.shape and np.array_equal(value, contents))
+
+def _map_lanes(data, B, N, WL, func):
+    # apply func(values, width) to the samples, or to each signal when B > 0
+    d = _as_array(data, copy=False)
+    if B == 0:
+        return func(d, WL)
+    if np.iscomplexobj(d):
+        d = np.column_stack((d.real, d.imag))
+    return np.column_stack([func(d[:, i], N[i]) for i in range(B)])
+
+FrameMismatch = namedtuple('FrameMismatch', ['field', 'index', 'expected', 'actual'])
+
+def _field_diff(field, a, b, skip_last=False):
+    # first difference between two fields, or None;
+    # scalar fields match every element of a per-beat field
+    if _is_scalar(a) and _is_scalar(b):
+        if a != b:
+            return FrameMismatch(field, None, a, b)
+        return None
+    if _is_scalar(a) or _is_scalar(b):
+        if _is_scalar(a):
+            b = _as_array(b, copy=False)
+        else:
+            a = _as_array(a, copy=False)
+        if skip_last:
+            a = a if _is_scalar(a) else a[:-1]
+            b = b if _is_scalar(b) else b[:-1]
+    else:
+        a = _as_array(a, copy=False)
+        b = _as_array(b, copy=False)
+        if len(a) != len(b):
+            return FrameMismatch(field+' length', None, len(a), len(b))
+        if a.shape != b.shape:
+            return FrameMismatch(field+' shape', None, a.shape, b.shape)
+    ne = np.asarray(a != b)
+    if ne.ndim > 1:
+        ne = ne.reshape(len(ne), -1).any(axis=1)
+    if not ne.any():
+        return None
+    i = int(np.argmax(ne))
+    a = a if _is_scalar(a) else a[i].tolist()
+    b = b if _is_scalar(b) else b[i].tolist()
+    return FrameMismatch(field, i, a, b)
+
+
+def pause_periodic(period, duty, offset=0):
+    # paused for the first duty cycles of every period
+    p = [i < duty for i in range(period)]
+    return itertools.cycle(p[offset % period:] + p[:offset % period])
+
+def pause_random(probability, seed=None):
+    rng = random.Random(seed)
+    while True:
+        yield rng.random() < probability
+
+def pause_bursts(bursts, repeat=True):
+    # bursts is a list of (run, gap) cycle counts
+    while True:
+        for run, gap in bursts:
+            for i in range(run):
+                yield False
+            for i in range(gap):
+                yield True
+        if not repeat:
+            break
+
+def _pause_pattern(pause):
+    # pause is a signal or constant, or an iterable of per-cycle pause values
+    if pause is None or isinstance(pause, (int, SignalType)):
+        return pause or 0, None
+    return 0, iter(pause)
+
+
 class AXIStreamFrame(object):
-    def __init__(self, data=b'', keep=None, id=None, dest=None, user=None, last_cycle_user=None):
+    __slots__ = ('B', 'N', 'M', 'WL', '_data', '_keep', '_id', '_dest', '_user', '_last_cycle_user', '_cache', '_own')
+
+    data = _payload('data')
+    keep = _payload('keep')
+    id = _payload('id')
+    dest = _payload('dest')
+    user = _payload('user')
+    last_cycle_user = _payload('last_cycle_user')
+
+    def __init__(self, data=b'', keep=None, id=None, dest=None, user=None, last_cycle_user=None, copy=True):
+        # build results keyed on (B, N, M, WL); with copy=True the payload
+        # is owned by the frame and becomes read-only once built or copied
+        self._cache = {}
+        self._own = set()
         self.B = 0
         self.N = 8
         self.M = 1
@@ -40,102 +300,94 @@ class AXIStreamFrame(object):
         self.last_cycle_user = None
 
         if type(data) in (bytes, bytearray):
-            self.data = bytearray(data)
-            self.keep = keep
-            self.id = id
-            self.dest = dest
-            self.user = user
+            self.data = bytearray(data) if copy else data
+            self.keep = _sideband(keep, copy)
+            self.id = _sideband(id, copy)
+            self.dest = _sideband(dest, copy)
+            self.user = _sideband(user, copy)
             self.last_cycle_user = last_cycle_user
         elif type(data) is AXIStreamFrame:
+            if copy:
+                # share the owned arrays of data instead of copying them
+                for name in data._own:
+                    _freeze(getattr(data, name))
             self.N = data.N
             self.WL = data.WL
             if type(data.data) is bytearray:
-                self.data = bytearray(data.data)
+                self.data = bytearray(data.data) if copy else data.data
             else:
-                self.data = list(data.data)
-            if data.keep is not None:
-                self.keep = list(data.keep)
+                self.data = _as_array(data.data, copy)
+            self.keep = _sideband(data.keep, copy)
             if data.id is not None:
-                if type(data.id) in (int, bool):
-                    self.id = data.id
-                else:
-                    self.id = list(data.id)
+                self.id = _sideband(data.id, copy)
             if data.dest is not None:
-                if type(data.dest) in (int, bool):
-                    self.dest = data.dest
-                else:
-                    self.dest = list(data.dest)
-            if data.user is not None:
-                if type(data.user) in (int, bool):
-                    self.user = data.user
-                else:
-                    self.user = list(data.user)
+                self.dest = _sideband(data.dest, copy)
+            self.user = _sideband(data.user, copy)
             self.last_cycle_user = data.last_cycle_user
+            # payload is identical, so share the build results both ways;
+            # a frame sent twice is only built once
+            self._cache = data._cache
         else:
-            self.data = list(data)
-            self.keep = keep
-            self.id = id
-            self.dest = dest
-            self.user = user
+            self.data = _as_array(data, copy)
+            self.keep = _sideband(keep, copy)
+            self.id = _sideband(id, copy)
+            self.dest = _sideband(dest, copy)
+            self.user = _sideband(user, copy)
             self.last_cycle_user = last_cycle_user
 
+        if copy:
+            self._own = set(_payload_names)
+
     def build(self):
         if self.data is None:
             return
 
-        f = list(self.data)
-        tdata = []
-        tkeep = []
-        tid = []
-        tdest = []
-        tuser = []
-        i = 0
-
-        while len(f) > 0:
-            if self.B == 0:
-                data = 0
-                keep = 0
-                for j in range(self.M):
-                    data = data | (f.pop(0) << (j*self.WL))
-                    keep = keep | (1 << j)
-                    if len(f) == 0: break
-                tdata.append(data)
-
-                if self.keep is None:
-                    tkeep.append(keep)
-                else:
-                    tkeep.append(self.keep[i])
-            else:
-                # multiple tdata signals
-                data = 0
-                tdata.append(f.pop(0))
-                tkeep.append(0)
-
-            if self.id is None:
-                tid.append(0)
-            elif type(self.id) is int:
-                tid.append(self.id)
-            else:
-                tid.append(self.id[i])
+        for name in self._own:
+            _freeze(getattr(self, name))
+        payload = [_snapshot(getattr(self, name)) for name in _payload_names]
 
-            if self.dest is None:
-                tdest.append(0)
-            elif type(self.dest) is int:
-                tdest.append(self.dest)
-            else:
-                tdest.append(self.dest[i])
+        # results built by copies of the frame are only used while the
+        # payload is the same
+        key = (self.B, _key(self.N), self.M, _key(self.WL))
+        cached = self._cache.get(key)
+        if cached is not None and all(_unchanged(getattr(self, name), p) for name, p in zip(_payload_names, cached[0])):
+            return cached[1]
 
-            if self.user is None:
-                tuser.append(0)
-            elif type(self.user) is int:
-                tuser.append(self.user)
-            else:
-                tuser.append(self.user[i])
-            i += 1
+        f = _as_array(self.data, copy=False)
+
+        if self.B == 0:
+            count = (len(f)+self.M-1) // self.M
+            tdata, tkeep = _pack(f, self.M, self.WL, self.N)
+
+            if self.keep is not None:
+                tkeep = np.asarray(self.keep)[:count]
+        else:
+            # multiple tdata signals, one column per signal
+            count = len(f)
+            if np.iscomplexobj(f):
+                # IQ pairs
+                f = np.column_stack((f.real, f.imag)).round().astype(np.int64)
+            tdata = f.reshape(count, -1)
+            N = self.N if type(self.N) is list else [self.N]*tdata.shape[1]
+            if tdata.dtype.kind != 'u' or tdata.dtype.itemsize*8 > min(N):
+                # wrap to the width of each signal
+                masks = [2**n-1 for n in N]
+                if max(N) <= 64:
+                    tdata = tdata.astype(np.uint64) & np.array(masks, dtype=np.uint64)
+                else:
+                    tdata = tdata.astype(object) & np.array(masks, dtype=object)
+            tkeep = np.zeros(count, dtype=np.uint8)
+
+        tid = _field(self.id, count)
+        tdest = _field(self.dest, count)
+        tuser = _field(self.user, count)
 
         if self.last_cycle_user:
+            tuser = tuser.astype(_dtype(max(int(self.last_cycle_user).bit_length(), 64)))
             tuser[-1] = self.last_cycle_user
 
+        self._cache[key] = payload, (tdata, tkeep, tid, tdest, tuser)
+
         return tdata, tkeep, tid, tdest, tuser
 
     def parse(self, tdata, tkeep, tid, tdest, tuser):
@@ -144,93 +396,56 @@ class AXIStreamFrame(object):
         if len(tdata) != len(tkeep) or len(tdata) != len(tid) or len(tdata) != len(tdest) or len(tdata) != len(tuser):
             raise Exception("Invalid data")
 
-        self.data = []
-        self.keep = []
-        self.id = []
-        self.dest = []
-        self.user = []
-
         if self.B == 0:
-            mask = 2**self.WL-1
-
-            for i in range(len(tdata)):
-                for j in range(self.M):
-                    if tkeep[i] & (1 << j):
-                        self.data.append((tdata[i] >> (j*self.WL)) & mask)
-                self.keep.append(tkeep[i])
-                self.id.append(tid[i])
-                self.dest.append(tdest[i])
-                self.user.append(tuser[i])
+            self.data = _unpack(tdata, tkeep, self.M, self.WL, self.N)
         else:
-            for i in range(len(tdata)):
-                self.data.append(tdata[i])
-                self.keep.append(tkeep[i])
-                self.id.append(tid[i])
-                self.dest.append(tdest[i])
-                self.user.append(tuser[i])
+            self.data = np.asarray(tdata, dtype=_dtype(max(self.N))).reshape(len(tkeep), self.B)
+
+        self.keep = np.array(tkeep, dtype=_dtype(self.M))
+        self.id = _list_array(tid)
+        self.dest = _list_array(tdest)
+        self.user = _list_array(tuser)
 
         if self.WL == 8:
             self.data = bytearray(self.data)
 
-        self.last_cycle_user = self.user[-1]
+        self.last_cycle_user = int(self.user[-1])
 
-    def __eq__(self, other):
-        if not isinstance(other, AXIStreamFrame):
-            return False
-        if self.data != other.data:
-            return False
+        self._own = set(_payload_names)
+
+    def compare(self, other):
+        # None if the frames match, otherwise a FrameMismatch describing the
+        # first difference; index is the sample index for data and the beat
+        # index for the per-beat fields
+        d = _field_diff('data', self.data, other.data)
+        if d is not None:
+            return d
         if self.keep is not None and other.keep is not None:
-            if self.keep != other.keep:
-                return False
+            d = _field_diff('keep', self.keep, other.keep)
+            if d is not None:
+                return d
         if self.id is not None and other.id is not None:
-            if type(self.id) in (int, bool) and type(other.id) is list:
-                for k in other.id:
-                    if self.id != k:
-                        return False
-            elif type(other.id) in (int, bool) and type(self.id) is list:
-                for k in self.id:
-                    if other.id != k:
-                        return False
-            elif self.id != other.id:
-                return False
+            d = _field_diff('id', self.id, other.id)
+            if d is not None:
+                return d
         if self.dest is not None and other.dest is not None:
-            if type(self.dest) in (int, bool) and type(other.dest) is list:
-                for k in other.dest:
-                    if self.dest != k:
-                        return False
-            elif type(other.dest) in (int, bool) and type(self.dest) is list:
-                for k in self.dest:
-                    if other.dest != k:
-                        return False
-            elif self.dest != other.dest:
-                return False
+            d = _field_diff('dest', self.dest, other.dest)
+            if d is not None:
+                return d
         if self.last_cycle_user is not None and other.last_cycle_user is not None:
             if self.last_cycle_user != other.last_cycle_user:
-                return False
+                return FrameMismatch('last_cycle_user', None, self.last_cycle_user, other.last_cycle_user)
             if self.user is not None and other.user is not None:
-                if type(self.user) in (int, bool) and type(other.user) is list:
-                    for k in other.user[:-1]:
-                        if self.user != k:
-                            return False
-                elif type(other.user) in (int, bool) and type(self.user) is list:
-                    for k in self.user[:-1]:
-                        if other.user != k:
-                            return False
-                elif self.user != other.user:
-                    return False
+                return _field_diff('user', self.user, other.user, skip_last=True)
         else:
             if self.user is not None and other.user is not None:
-                if type(self.user) in (int, bool) and type(other.user) is list:
-                    for k in other.user:
-                        if self.user != k:
-                            return False
-                elif type(other.user) in (int, bool) and type(self.user) is list:
-                    for k in self.user:
-                        if other.user != k:
-                            return False
-                elif self.user != other.user:
-                    return False
-        return True
+                return _field_diff('user', self.user, other.user)
+        return None
+
+    def __eq__(self, other):
+        if not isinstance(other, AXIStreamFrame):
+            return False
+        return self.compare(other) is None
 
     def __repr__(self):
         return (
@@ -242,17 +457,218 @@ class AXIStreamFrame(object):
                 ('last_cycle_user=%s)' % repr(self.last_cycle_user))
             )
 
+    def as_complex(self, signed=True):
+        # IQ pairs of a two signal frame as complex values; signed converts
+        # from two's complement using the signal widths in N
+        d = _as_array(self.data, copy=False)
+        if signed and type(self.N) is list:
+            d = _map_lanes(d, self.B, self.N, self.WL, fixed_point.to_signed)
+        return d[:, 0] + 1j*d[:, 1]
+
+    def summary(self, n=4):
+        # length, first and last n samples and a CRC of the data, for logging
+        data = _as_array(self.data, copy=False)
+        if data.dtype == object:
+            crc = zlib.crc32(repr(data.tolist()).encode())
+        else:
+            # same CRC for the same values whatever the dtype
+            crc = zlib.crc32(data.astype('<u8').tobytes())
+        if len(data) > 2*n:
+            s = '%s ... %s' % (data[:n].tolist(), data[-n:].tolist())
+        else:
+            s = '%s' % data.tolist()
+        return 'AXIStreamFrame(len=%d, data=%s, crc=0x%08x)' % (len(data), s, crc)
+
     def __iter__(self):
         return self.data.__iter__()
 
 
+class _Summary(object):
+    # formats a frame summary only if the log record is emitted
+    __slots__ = ('frame',)
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def __str__(self):
+        return self.frame.summary()
+
+
+class _SampleStream(object):
+    def __init__(self, samples, frame_length=None, chunk_length=4096):
+        self.samples = samples
+        self.frame_length = frame_length
+        self.chunk_length = chunk_length
+
+    def chunks(self, B):
+        # items are single samples or arrays of samples; a complex value is
+        # one sample spanning two tdata signals
+        for item in self.samples:
+            a = np.asarray(item)
+            if a.ndim == (1 if B > 0 and not np.iscomplexobj(a) else 0):
+                a = a.reshape((1,)+a.shape)
+            yield a
+
+    def regroup(self, B, M):
+        # cut the sample stream into pieces; partial beats only at the end of a frame
+        size = max(self.chunk_length // M, 1)*M
+        left = self.frame_length
+        parts = []
+        count = 0
+
+        for a in self.chunks(B):
+            if len(a) == 0:
+                continue
+            parts.append(a)
+            count += len(a)
+
+            n = size if left is None else min(size, left)
+            if count < n:
+                continue
+
+            buf = np.concatenate(parts) if len(parts) > 1 else parts[0]
+            pos = 0
+            while count-pos >= n:
+                end = False
+                if left is not None:
+                    left -= n
+                    end = left == 0
+                    if end:
+                        left = self.frame_length
+                yield buf[pos:pos+n], end
+                pos += n
+                n = size if left is None else min(size, left)
+            parts = [buf[pos:]] if pos < len(buf) else []
+            count -= pos
+
+        if count:
+            yield np.concatenate(parts), True
+
+    def pieces(self, B, M):
+        # look ahead one piece so that the final piece always ends the frame
+        prev = None
+        for piece in self.regroup(B, M):
+            if prev is not None:
+                yield AXIStreamFrame(prev[0], copy=False), prev[1]
+            prev = piece
+        if prev is not None:
+            yield AXIStreamFrame(prev[0], copy=False), True
+
+
+class AXIStreamStats(object):
+    __slots__ = ('cycles', 'beats', 'frames', 'stall_cycles', 'starve_cycles', 'idle_cycles')
+
+    def __init__(self):
+        self.cycles = 0
+        self.beats = 0
+        self.frames = 0
+        # tvalid and not tready
+        self.stall_cycles = 0
+        # tready and not tvalid
+        self.starve_cycles = 0
+        # neither tvalid nor tready
+        self.idle_cycles = 0
+
+    def update(self, tvalid, tready, tlast):
+        self.cycles += 1
+        if tvalid:
+            if tready:
+                self.beats += 1
+                if tlast:
+                    self.frames += 1
+            else:
+                self.stall_cycles += 1
+        elif tready:
+            self.starve_cycles += 1
+        else:
+            self.idle_cycles += 1
+
+    def copy(self):
+        s = AXIStreamStats()
+        for k in self.__slots__:
+            setattr(s, k, getattr(self, k))
+        return s
+
+    def utilization(self):
+        return self.beats / self.cycles if self.cycles else 0.0
+
+    def __repr__(self):
+        return 'AXIStreamStats(%s)' % ', '.join('%s=%d' % (k, getattr(self, k)) for k in self.__slots__)
+
+
+class BeatTimes(object):
+    # simulation times of transferred beats and frames
+    def __init__(self):
+        self.beat = array('q')
+        self.samples = array('q')
+        self.frame_start = array('q')
+        self.frame_end = array('q')
+        self.in_frame = False
+
+    def record(self, t, samples, last):
+        self.beat.append(t)
+        self.samples.append(samples)
+        if not self.in_frame:
+            self.frame_start.append(t)
+        if last:
+            self.frame_end.append(t)
+        self.in_frame = not last
+
+    def sample_times(self):
+        # time of each sample, beats with several lanes repeat their time
+        return np.repeat(np.frombuffer(self.beat, dtype=np.int64), np.frombuffer(self.samples, dtype=np.int64))
+
+
+class LatencyStats(object):
+    def __init__(self, latency):
+        self.latency = latency
+        self.count = len(latency)
+        self.min = int(latency.min()) if self.count else None
+        self.max = int(latency.max()) if self.count else None
+        self.mean = float(latency.mean()) if self.count else None
+
+    def histogram(self):
+        # (latency, count) pairs
+        values, counts = np.unique(self.latency, return_counts=True)
+        return list(zip(values.tolist(), counts.tolist()))
+
+    def __repr__(self):
+        return 'LatencyStats(count=%d, min=%s, mean=%s, max=%s)' % (self.count, self.min, self.mean, self.max)
+
+
+def measure_latency(source, sink, ratio=1, offset=0, period=1):
+    # match output sample k with input sample k*ratio+offset, e.g. ratio=R for a decimator;
+    # latencies are in simulation time units, or in cycles when period is the clock period
+    t_in = source.times.sample_times()
+    t_out = sink.times.sample_times()
+    idx = np.arange(len(t_out))*ratio + offset
+    ok = (idx >= 0) & (idx < len(t_in))
+    return LatencyStats((t_out[ok] - t_in[idx[ok]]) // period)
+
+
 class AXIStreamSource(object):
     def __init__(self):
         self.has_logic = False
-        self.queue = []
+        self.queue = deque()
+        self.stats = AXIStreamStats()
+        self.times = None
+        self.pause_pattern = None
+
+    def set_pause(self, pause=None):
+        # per-cycle pause values from the next cycle on, e.g. pause_periodic(4, 3);
+        # None stops the pattern.  Combined with the pause signal, if any.
+        self.pause_pattern = _pause_pattern(pause)[1]
+
+    def send(self, frame, copy=True):
+        # copy=False hands the frame (or buffer) over to the source without duplicating it
+        if copy or type(frame) is not AXIStreamFrame:
+            frame = AXIStreamFrame(frame, copy=copy)
+        self.queue.append(frame)
 
-    def send(self, frame):
-        self.queue.append(AXIStreamFrame(frame))
+    def send_stream(self, samples, frame_length=None, chunk_length=4096):
+        # samples is an iterator of samples or sample arrays, pulled as beats go out.
+        # tlast is set every frame_length samples, or only after the last sample when None
+        self.queue.append(_SampleStream(samples, frame_length, chunk_length))
 
     def write(self, data):
         self.send(data)
@@ -263,6 +679,16 @@ class AXIStreamSource(object):
     def empty(self):
         return self.count() == 0
 
+    def get_stats(self):
+        return self.stats.copy()
+
+    def reset_stats(self):
+        self.stats = AXIStreamStats()
+
+    def track_times(self, enable=True):
+        # record beat and frame times for measure_latency
+        self.times = BeatTimes() if enable else None
+
     def create_logic(self,
                 clk,
                 rst,
@@ -275,6 +701,8 @@ class AXIStreamSource(object):
                 tdest=Signal(intbv(0)),
                 tuser=Signal(intbv(0)),
                 pause=0,
+                signed=False,
+                overflow='wrap',
                 name=None
             ):
 
@@ -285,19 +713,23 @@ class AXIStreamSource(object):
         tready_int = Signal(bool(False))
         tvalid_int = Signal(bool(False))
 
+        pause, self.pause_pattern = _pause_pattern(pause)
+        pattern_pause = Signal(bool(0))
+
         @always_comb
         def pause_logic():
-            tready_int.next = tready and not pause
-            tvalid.next = tvalid_int and not pause
+            tready_int.next = tready and not (pause or pattern_pause)
+            tvalid.next = tvalid_int and not (pause or pattern_pause)
 
         @instance
         def logic():
             frame = AXIStreamFrame()
-            data = []
-            keep = []
-            id = []
-            dest = []
-            user = []
+            pieces = None
+            data = keep = id = dest = user = None
+            cols = None
+            ptr = 0
+            cnt = 0
+            last = True
             B = 0
             N = len(tdata)
             M = len(tkeep)
@@ -314,6 +746,9 @@ class AXIStreamSource(object):
                 yield clk.posedge, rst.posedge
 
                 if rst:
+                    pieces = None
+                    ptr = cnt = 0
+                    last = True
                     if B > 0:
                         for s in tdata:
                             s.next = 0
@@ -326,68 +761,166 @@ class AXIStreamSource(object):
                     tvalid_int.next = False
                     tlast.next = False
                 else:
-                    if tready_int and tvalid:
-                        if len(data) > 0:
-                            if B > 0:
-                                l = data.pop(0)
-                                for i in range(B):
-                                    tdata[i].next = l[i]
-                            else:
-                                tdata.next = data.pop(0)
-                            tkeep.next = keep.pop(0)
-                            tid.next = id.pop(0)
-                            tdest.next = dest.pop(0)
-                            tuser.next = user.pop(0)
-                            tvalid_int.next = True
-                            tlast.next = len(data) == 0
-                        else:
-                            tvalid_int.next = False
-                            tlast.next = False
-                    if (tlast and tready_int and tvalid) or not tvalid_int:
-                        if len(self.queue) > 0:
-                            frame = self.queue.pop(0)
+                    self.stats.update(tvalid, tready, tlast)
+
+                    times = self.times
+                    if times is not None and tvalid and tready:
+                        times.record(now(), bin(int(tkeep)).count('1') if M > 1 else 1, bool(tlast))
+
+                    pattern = self.pause_pattern
+                    if pattern is not None:
+                        pattern_pause.next = bool(next(pattern, False))
+                    elif pattern_pause:
+                        pattern_pause.next = False
+
+                    if (tready_int and tvalid) or not tvalid_int:
+                        while ptr == cnt:
+                            # current piece done, fetch the next one
+                            if pieces is None:
+                                if len(self.queue) == 0:
+                                    break
+                                item = self.queue.popleft()
+                                if type(item) is _SampleStream:
+                                    pieces = item.pieces(B, M)
+                                else:
+                                    pieces = iter(((item, True),))
+                            piece = next(pieces, None)
+                            if piece is None:
+                                pieces = None
+                                continue
+                            frame, last = piece
+                            if overflow != 'wrap':
+                                # out of range samples clamp instead of wrapping
+                                frame = AXIStreamFrame(frame, copy=False)
+                                frame.data = _map_lanes(frame.data, B, N, WL, lambda x, w: fixed_point.convert(x, w, signed, overflow))
                             frame.B = B
                             frame.N = N
                             frame.M = M
                             frame.WL = WL
                             data, keep, id, dest, user = frame.build()
-                            if name is not None:
-                                print("[%s] Sending frame %s" % (name, repr(frame)))
                             if B > 0:
-                                l = data.pop(0)
+                                cols = [data[:, i] for i in range(B)]
+                            ptr = 0
+                            cnt = len(data)
+                            if name is not None and logger.isEnabledFor(logging.INFO):
+                                logger.info("[%s] Sending frame %s", name, _Summary(frame))
+
+                        if ptr < cnt:
+                            if B > 0:
                                 for i in range(B):
-                                    tdata[i].next = l[i]
+                                    tdata[i].next = int(cols[i][ptr])
                             else:
-                                tdata.next = data.pop(0)
-                            tkeep.next = keep.pop(0)
-                            tid.next = id.pop(0)
-                            tdest.next = dest.pop(0)
-                            tuser.next = user.pop(0)
+                                tdata.next = int(data[ptr])
+                            tkeep.next = int(keep[ptr])
+                            tid.next = int(id[ptr])
+                            tdest.next = int(dest[ptr])
+                            tuser.next = int(user[ptr])
+                            ptr += 1
                             tvalid_int.next = True
-                            tlast.next = len(data) == 0
+                            tlast.next = last and ptr == cnt
+                        else:
+                            tvalid_int.next = False
+                            tlast.next = False
 
         return instances()
 
 
+class RingBuffer(object):
+    # keeps the most recent samples in a preallocated array, for use as a sink callback
+    def __init__(self, buf):
+        self.buf = buf
+        self.count = 0
+
+    def write(self, frame):
+        data = _as_array(frame.data, copy=False)
+        size = len(self.buf)
+        n = len(data)
+        if n >= size:
+            data = data[n-size:]
+            k = self.count+n-size
+        else:
+            k = self.count
+        k = k % size
+        m = min(len(data), size-k)
+        self.buf[k:k+m] = data[:m]
+        self.buf[:len(data)-m] = data[m:]
+        self.count += n
+
+    def __call__(self, frame):
+        self.write(frame)
+
+    def latest(self, count=None):
+        # most recent samples, oldest first
+        size = len(self.buf)
+        if count is None or count > min(self.count, size):
+            count = min(self.count, size)
+        k = self.count % size
+        if count <= k:
+            return self.buf[k-count:k].copy()
+        return np.concatenate((self.buf[size-(count-k):], self.buf[:k]))
+
+
 class AXIStreamSink(object):
     def __init__(self):
         self.has_logic = False
-        self.queue = []
-        self.read_queue = []
+        self.queue = deque()
+        self.read_queue = deque()
+        self.read_offset = 0
+        self.skip_asserts = False
+        self.stats = AXIStreamStats()
+        self.times = None
+        self.callback = None
+        self.chunk_length = None
+        self.pause_pattern = None
+
+    def set_pause(self, pause=None):
+        # per-cycle pause values from the next cycle on, e.g. pause_random(0.5);
+        # None stops the pattern.  Combined with the pause signal, if any.
+        self.pause_pattern = _pause_pattern(pause)[1]
+
+    def set_callback(self, callback, chunk_length=None):
+        # completed frames are handed to callback instead of being queued;
+        # with chunk_length, frames are also split into pieces of that many samples
+        self.callback = callback
+        self.chunk_length = chunk_length
 
     def recv(self):
         if len(self.queue) > 0:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         return None
 
-    def read(self, count=-1):
+    def _read_parts(self, count=-1):
+        # yield views of up to count queued samples, consuming them
         while len(self.queue) > 0:
-            self.read_queue.extend(self.queue.pop(0).data)
-        if count < 0:
-            count = len(self.read_queue)
-        data = self.read_queue[:count]
-        del self.read_queue[:count]
-        return data
+            self.read_queue.append(_as_array(self.queue.popleft().data, copy=False))
+        while count != 0 and len(self.read_queue) > 0:
+            chunk = self.read_queue[0]
+            n = len(chunk)-self.read_offset
+            if 0 <= count < n:
+                n = count
+            yield chunk[self.read_offset:self.read_offset+n]
+            self.read_offset += n
+            if self.read_offset == len(chunk):
+                self.read_queue.popleft()
+                self.read_offset = 0
+            if count > 0:
+                count -= n
+
+    def read(self, count=-1):
+        parts = list(self._read_parts(count))
+        if len(parts) == 0:
+            return np.zeros(0, dtype=np.uint64)
+        if len(parts) == 1:
+            return parts[0].copy()
+        return np.concatenate(parts)
+
+    def read_into(self, buf):
+        # fill buf with up to len(buf) samples, returns the number of samples written
+        n = 0
+        for part in self._read_parts(len(buf)):
+            buf[n:n+len(part)] = part
+            n += len(part)
+        return n
 
     def count(self):
         return len(self.queue)
@@ -395,6 +928,16 @@ class AXIStreamSink(object):
     def empty(self):
         return self.count() == 0
 
+    def get_stats(self):
+        return self.stats.copy()
+
+    def reset_stats(self):
+        self.stats = AXIStreamStats()
+
+    def track_times(self, enable=True):
+        # record beat and frame times for measure_latency
+        self.times = BeatTimes() if enable else None
+
     def create_logic(self,
                 clk,
                 rst,
@@ -407,6 +950,7 @@ class AXIStreamSink(object):
                 tdest=Signal(intbv(0)),
                 tuser=Signal(intbv(0)),
                 pause=0,
+                signed=False,
                 name=None
             ):
 
@@ -417,10 +961,13 @@ class AXIStreamSink(object):
         tready_int = Signal(bool(False))
         tvalid_int = Signal(bool(False))
 
+        pause, self.pause_pattern = _pause_pattern(pause)
+        pattern_pause = Signal(bool(0))
+
         @always_comb
         def pause_logic():
-            tready.next = tready_int and not pause
-            tvalid_int.next = tvalid and not pause
+            tready.next = tready_int and not (pause or pattern_pause)
+            tvalid_int.next = tvalid and not (pause or pattern_pause)
 
         @instance
         def logic():
@@ -434,6 +981,7 @@ class AXIStreamSink(object):
             N = len(tdata)
             M = len(tkeep)
             WL = int((len(tdata)+M-1)/M)
+            keep_high = 1 << len(tkeep)-1
             first = True
 
             if type(tdata) is list or type(tdata) is tuple:
@@ -456,57 +1004,72 @@ class AXIStreamSink(object):
                     user = []
                     first = True
                 else:
+                    self.stats.update(tvalid, tready, tlast)
+
+                    times = self.times
+                    if times is not None and tvalid and tready:
+                        times.record(now(), bin(int(tkeep)).count('1') if M > 1 else 1, bool(tlast))
+
                     tready_int.next = True
 
+                    pattern = self.pause_pattern
+                    if pattern is not None:
+                        pattern_pause.next = bool(next(pattern, False))
+                    elif pattern_pause:
+                        pattern_pause.next = False
+
                     if tvalid_int:
 
-                        if not skip_asserts:
+                        k = int(tkeep)
+
+                        if not skip_asserts and not self.skip_asserts:
                             # zero tkeep not allowed
-                            assert int(tkeep) != 0
                             # tkeep must be contiguous
                             # i.e. 0b00011110 allowed, but 0b00011010 not allowed
-                            b = int(tkeep)
-                            while b & 1 == 0:
-                                b = b >> 1
-                            while b & 1 == 1:
-                                b = b >> 1
-                            assert b == 0
+                            # adding the lowest set bit clears a contiguous run
+                            assert k != 0 and (k + (k & -k)) & k == 0
                             # tkeep must not have gaps across cycles
                             if not first:
                                 # not first cycle; lowest bit must be set
-                                assert int(tkeep) & 1
+                                assert k & 1
                             if not tlast:
                                 # not last cycle; highest bit must be set
-                                assert int(tkeep) & (1 << len(tkeep)-1)
+                                assert k & keep_high
 
                         if B > 0:
-                            l = []
-                            for i in range(B):
-                                l.append(int(tdata[i]))
-                            data.append(l)
+                            for s in tdata:
+                                data.append(int(s))
                         else:
                             data.append(int(tdata))
-                        keep.append(int(tkeep))
+                        keep.append(k)
                         id.append(int(tid))
                         dest.append(int(tdest))
                         user.append(int(tuser))
                         first = False
-                        if tlast:
+                        if tlast or (self.chunk_length and len(keep)*M >= self.chunk_length):
                             frame.B = B
                             frame.N = N
                             frame.M = M
                             frame.WL = WL
+                            if B > 0:
+                                # beats x B
+                                data = np.array(data, dtype=_dtype(max(N))).reshape(len(keep), B)
                             frame.parse(data, keep, id, dest, user)
-                            self.queue.append(frame)
-                            if name is not None:
-                                print("[%s] Got frame %s" % (name, repr(frame)))
+                            if signed:
+                                frame.data = _map_lanes(frame.data, B, N, WL, fixed_point.to_signed)
+                            if self.callback is not None:
+                                self.callback(frame)
+                            else:
+                                self.queue.append(frame)
+                            if name is not None and logger.isEnabledFor(logging.INFO):
+                                logger.info("[%s] Got frame %s", name, _Summary(frame))
                             frame = AXIStreamFrame()
                             data = []
                             keep = []
                             id = []
                             dest = []
                             user = []
-                            first = True
+                            first = bool(tlast)
 
         return instances()
 
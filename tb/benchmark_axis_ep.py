@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2014-2018 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Wall time of a single AXIStreamSource frame versus frame length.
+# Per-beat cost should stay flat as the frame grows; the run fails if the
+# per-beat time of the longest frame is more than max_ratio times that of
+# the shortest.  Default lengths are 1k to 100k beats, --long goes to 10M.
+#
+# usage: python benchmark_axis_ep.py [--sink] [--long] [length ...]
+
+from myhdl import *
+import sys
+import time
+
+import numpy as np
+
+import axis_ep
+
+def bench(length, use_sink=False):
+
+    clk = Signal(bool(0))
+    rst = Signal(bool(0))
+
+    tdata = Signal(intbv(0)[16:])
+    tvalid = Signal(bool(0))
+    tready = Signal(bool(1))
+    tlast = Signal(bool(0))
+
+    source = axis_ep.AXIStreamSource()
+
+    source_logic = source.create_logic(
+        clk,
+        rst,
+        tdata=tdata,
+        tvalid=tvalid,
+        tready=tready,
+        tlast=tlast
+    )
+
+    if use_sink:
+        sink = axis_ep.AXIStreamSink()
+
+        sink_logic = sink.create_logic(
+            clk,
+            rst,
+            tdata=tdata,
+            tvalid=tvalid,
+            tready=tready,
+            tlast=tlast
+        )
+
+    source.send(axis_ep.AXIStreamFrame(np.arange(length, dtype=np.uint16)))
+
+    @always(delay(4))
+    def clkgen():
+        clk.next = not clk
+
+    @instance
+    def check():
+        # frame is done once tlast drops
+        yield tlast.negedge
+
+        raise StopSimulation
+
+    return instances()
+
+max_ratio = 2.0
+
+def run(length, use_sink=False, repeat=1):
+    # best of repeat runs
+    best = None
+    for k in range(repeat):
+        sim = Simulation(bench(length, use_sink))
+        start = time.perf_counter()
+        sim.run(quiet=1)
+        t = time.perf_counter() - start
+        if best is None or t < best:
+            best = t
+    return best
+
+def check(lengths, use_sink=False):
+    # per-beat time of each length; short runs are repeated to reduce noise
+    per_beat = []
+
+    print("%12s %12s %12s" % ("beats", "seconds", "us/beat"))
+    for length in lengths:
+        t = run(length, use_sink, repeat=3 if length <= 10**4 else 1)
+        per_beat.append(t/length)
+        print("%12d %12.3f %12.3f" % (length, t, t/length*1e6))
+
+    ratio = per_beat[-1] / per_beat[0]
+    print("per-beat ratio %d/%d beats: %.2f (limit %.1f)" % (lengths[-1], lengths[0], ratio, max_ratio))
+
+    assert ratio < max_ratio, "per-beat time grows with frame length"
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    use_sink = '--sink' in args
+    long_run = '--long' in args
+    lengths = sorted(int(float(a)) for a in args if not a.startswith('--'))
+    if not lengths:
+        lengths = [10**k for k in range(3, 8 if long_run else 6)]
+
+    check(lengths, use_sink)
@@ -0,0 +1,142 @@
+"""
+
+Copyright (c) 2014-2018 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
+
+# compiled .vvp files are stored here under the hash of everything that
+# went into them, so unchanged benches skip iverilog entirely
+cache_dir = os.environ.get('IVERILOG_CACHE',
+    os.path.join(tb_dir, 'build_cache'))
+
+include_exts = ('.vh', '.svh')
+
+_iverilog_version = None
+
+def iverilog_version():
+    # first line of iverilog -V, so that a compiler change invalidates the
+    # cache; empty when iverilog can't be run
+    global _iverilog_version
+    if _iverilog_version is None:
+        try:
+            p = subprocess.Popen(['iverilog', '-V'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            out = p.communicate()[0]
+        except OSError:
+            out = b''
+        _iverilog_version = out.decode(errors='replace').strip().split('\n')[0]
+    return _iverilog_version
+
+def _rel(path):
+    # paths in the key are relative to tb/ so that checkouts in different
+    # places share cached builds
+    return os.path.relpath(os.path.join(tb_dir, path), tb_dir)
+
+def _hash_file(h, path):
+    h.update(_rel(path).encode())
+    with open(os.path.join(tb_dir, path), 'rb') as f:
+        h.update(f.read())
+
+def build_args(srcs, toplevel, includes=(), params=None, defines=None, flags=()):
+    args = list(flags)
+    for inc in includes:
+        args.append('-I%s' % inc)
+    for k, v in sorted((defines or {}).items()):
+        args.append('-D%s=%s' % (k, v))
+    for k, v in sorted((params or {}).items()):
+        args.append('-P%s.%s=%s' % (toplevel, k, v))
+    return args + list(srcs)
+
+def build_key(srcs, toplevel, includes=(), params=None, defines=None, flags=()):
+    # srcs and includes may be absolute or relative to tb/
+    h = hashlib.sha256()
+
+    h.update(iverilog_version().encode())
+
+    args = build_args([_rel(src) for src in srcs], toplevel, [_rel(inc) for inc in includes], params, defines, flags)
+    h.update(' '.join(args).encode())
+
+    for src in srcs:
+        _hash_file(h, src)
+
+    # anything an `include could pull in
+    for inc in includes:
+        for name in sorted(os.listdir(os.path.join(tb_dir, inc))):
+            if name.endswith(include_exts):
+                _hash_file(h, os.path.join(inc, name))
+
+    return h.hexdigest()
+
+def build(srcs, toplevel, includes=(), params=None, defines=None, flags=()):
+    # compile srcs with iverilog unless an identical build is already cached;
+    # returns the path of the .vvp to run.  Relative source and include paths
+    # are taken from tb/ so benches can run from any directory.
+    srcs = [os.path.join(tb_dir, src) for src in srcs]
+    includes = [tb_dir] + [os.path.join(tb_dir, inc) for inc in includes]
+
+    key = build_key(srcs, toplevel, includes, params, defines, flags)
+    vvp = os.path.join(cache_dir, "%s-%s.vvp" % (toplevel, key[:16]))
+
+    if os.path.exists(vvp):
+        logger.info("Using cached build %s", vvp)
+        return vvp
+
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # build to a temporary name so concurrent builds never see a partial file
+    fd, tmp = tempfile.mkstemp(suffix='.vvp', dir=cache_dir)
+    os.close(fd)
+
+    cmd = ['iverilog', '-o', tmp] + build_args(srcs, toplevel, includes, params, defines, flags)
+    logger.info("Building %s: %s", toplevel, ' '.join(cmd))
+
+    try:
+        if subprocess.call(cmd):
+            raise Exception("Error running build command")
+        os.replace(tmp, vvp)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    return vvp
+
+def vvp_cmd(vvp):
+    # vvp command line for a Cosimulation.  Waveforms are only dumped when
+    # DUMP is set in the environment; DUMP_DEPTH, DUMP_START, DUMP_STOP and
+    # DUMP_TEST map to the plusargs handled in dump.vh.
+    cmd = "vvp -m myhdl %s" % vvp
+    if os.environ.get('DUMP', '0') not in ('', '0'):
+        cmd += " -lxt2 +dump"
+        for opt in ('depth', 'start', 'stop', 'test'):
+            val = os.environ.get('DUMP_' + opt.upper())
+            if val:
+                cmd += " +dump_%s=%d" % (opt, int(val))
+    return cmd
@@ -0,0 +1,7 @@
+import pytest
+
+# run each bench in its own directory so waveform dumps from parallel
+# runs (py.test -n) do not collide
+@pytest.fixture(autouse=True)
+def scratch_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
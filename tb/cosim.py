@@ -0,0 +1,71 @@
+"""
+
+Copyright (c) 2014-2018 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from myhdl import Cosimulation
+import os
+import re
+
+import build_cache
+
+_ports_cache = {}
+
+def _strip_comments(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    return re.sub(r'//[^\n]*', '', text)
+
+def _port_list(text, task):
+    m = re.search(r'\$%s\s*\(([^)]*)\)' % task, text)
+    if m is None:
+        return []
+    return [p.strip() for p in m.group(1).split(',') if p.strip()]
+
+def myhdl_ports(path):
+    # signal names passed through $from_myhdl and $to_myhdl in a wrapper
+    path = os.path.join(build_cache.tb_dir, path)
+    if path not in _ports_cache:
+        with open(path) as f:
+            text = _strip_comments(f.read())
+        _ports_cache[path] = (_port_list(text, 'from_myhdl'), _port_list(text, 'to_myhdl'))
+    return _ports_cache[path]
+
+def dut(toplevel, srcs, params=None, defines=None, includes=(), signals=None, **kwargs):
+    # build toplevel from srcs (with parameter overrides passed to iverilog
+    # as -P) through the build cache and connect every $from_myhdl and
+    # $to_myhdl signal of the wrapper by name from signals and kwargs
+    wrapper = [src for src in srcs if os.path.basename(src) == toplevel + '.v']
+    if not wrapper:
+        raise ValueError("No wrapper %s.v in sources" % toplevel)
+
+    from_ports, to_ports = myhdl_ports(wrapper[0])
+
+    sigs = dict(signals or {})
+    sigs.update(kwargs)
+
+    missing = [p for p in from_ports + to_ports if p not in sigs]
+    if missing:
+        raise ValueError("No signals for ports of %s: %s" % (toplevel, ', '.join(missing)))
+
+    vvp = build_cache.build(srcs, toplevel, includes=includes, params=params, defines=defines)
+
+    return Cosimulation(build_cache.vvp_cmd(vvp), **dict((p, sigs[p]) for p in from_ports + to_ports))
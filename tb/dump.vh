@@ -0,0 +1,83 @@
+/*
+
+Copyright (c) 2014-2018 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+*/
+
+// Language: Verilog 2001
+
+/*
+ * Opt-in waveform dumping for the testbench wrappers
+ *
+ * Include inside the wrapper module after defining DUMP_TOP as the wrapper
+ * module name.  Nothing is dumped unless +dump is given.
+ *
+ *   +dump              dump to <DUMP_TOP>.lxt
+ *   +dump_depth=<n>    $dumpvars depth, 1 dumps only the wrapper (DUT ports)
+ *   +dump_start=<t>    start dumping at time t
+ *   +dump_stop=<t>     stop dumping at time t
+ *   +dump_test=<n>     only dump while current_test is n
+ */
+
+reg dump_enable = 0;
+reg dump_in_time = 0;
+reg dump_active = 0;
+
+integer dump_depth = 0;
+integer dump_start = 0;
+integer dump_stop = 0;
+integer dump_test = -1;
+
+reg [8*256-1:0] dump_file;
+
+initial begin
+    if ($test$plusargs("dump")) begin
+        dump_enable = 1;
+
+        if ($value$plusargs("dump_depth=%d", dump_depth)) ;
+        if ($value$plusargs("dump_start=%d", dump_start)) ;
+        if ($value$plusargs("dump_stop=%d", dump_stop)) ;
+        if ($value$plusargs("dump_test=%d", dump_test)) ;
+
+        $sformat(dump_file, "%m.lxt");
+        $dumpfile(dump_file);
+        $dumpvars(dump_depth, `DUMP_TOP);
+        $dumpoff;
+
+        #(dump_start) dump_in_time = 1;
+
+        if (dump_stop > dump_start) begin
+            #(dump_stop - dump_start) dump_in_time = 0;
+        end
+    end
+end
+
+always @(dump_in_time or current_test) begin
+    if (dump_in_time && (dump_test < 0 || current_test == dump_test)) begin
+        if (!dump_active) begin
+            $dumpon;
+            dump_active = 1;
+        end
+    end else if (dump_active) begin
+        $dumpoff;
+        dump_active = 0;
+    end
+end
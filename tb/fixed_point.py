@@ -0,0 +1,79 @@
+"""
+
+Copyright (c) 2014-2018 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+
+import numpy as np
+
+def _int_array(x, width):
+    # integer array wide enough for width bit values plus a sign
+    x = np.asarray(x)
+    if x.dtype == object or width >= 64:
+        return x.astype(object)
+    if x.dtype == np.uint64 and x.size and x.max() >= 2**63:
+        # would turn negative as int64
+        return x.astype(object)
+    if x.dtype.kind == 'f':
+        x = np.round(x)
+    return x.astype(np.int64)
+
+def wrap(x, width, signed=False):
+    # keep the low width bits, like a truncating assignment in the RTL
+    x = _int_array(x, width) & (2**width-1)
+    if signed:
+        x = np.where(x >= 2**(width-1), x - 2**width, x)
+    return x
+
+def saturate(x, width, signed=False):
+    # clamp to the range of a width bit value
+    if signed:
+        lo, hi = -2**(width-1), 2**(width-1)-1
+    else:
+        lo, hi = 0, 2**width-1
+    return np.clip(_int_array(x, width), lo, hi)
+
+def to_signed(x, width):
+    # two's complement bus values to signed integers
+    return wrap(x, width, signed=True)
+
+def to_unsigned(x, width):
+    # signed integers to two's complement bus values
+    return wrap(x, width, signed=False)
+
+def convert(x, width, signed=False, overflow='wrap'):
+    # bus values for a width bit signed or unsigned stream
+    if overflow == 'saturate':
+        x = saturate(x, width, signed)
+    elif overflow != 'wrap':
+        raise ValueError("Invalid overflow mode %r" % overflow)
+    return to_unsigned(x, width)
+
+def from_float(x, width, frac, signed=True, overflow='saturate'):
+    # real values to bus values with frac fractional bits, rounding to nearest
+    return convert(np.round(np.asarray(x)*2**frac), width, signed, overflow)
+
+def to_float(x, width, frac, signed=True):
+    # bus values with frac fractional bits to real values
+    if signed:
+        x = to_signed(x, width)
+    return np.asarray(x, dtype=float) / 2**frac
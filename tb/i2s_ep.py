@@ -23,40 +23,218 @@ THE SOFTWARE.
 """
 
 from myhdl import *
+import logging
+import os
+import struct
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def _pcm8(raw):
+    # 8 bit samples are stored offset binary
+    return raw.astype(np.int16) - 128
+
+def _pcm24(raw):
+    # little endian 3 byte samples, sign extended from the top byte
+    return raw[..., 0].astype(np.int32) | raw[..., 1].astype(np.int32) << 8 | raw[..., 2].astype(np.int8).astype(np.int32) << 16
+
+def read_wav(path):
+    # memory-map the samples of a PCM WAV file as a (frames, channels) array,
+    # (frames, channels, 3) for 24 bit samples.  Returns the map, the sample
+    # rate and the function that converts rows of the map to integers, None
+    # when the samples can be used as they are.
+    with open(path, 'rb') as f:
+        riff, size, wave = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError("Not a WAV file: %s" % path)
+        fmt = None
+        while True:
+            hdr = f.read(8)
+            if len(hdr) < 8:
+                raise ValueError("No data chunk in WAV file: %s" % path)
+            cid, clen = struct.unpack('<4sI', hdr)
+            if cid == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', f.read(16))
+                f.seek(clen - 16 + (clen & 1), 1)
+            elif cid == b'data':
+                offset = f.tell()
+                break
+            else:
+                f.seek(clen + (clen & 1), 1)
+
+    if fmt is None:
+        raise ValueError("No fmt chunk in WAV file: %s" % path)
+
+    tag, channels, rate, byte_rate, align, bits = fmt
+    if tag not in (1, 0xfffe):
+        raise ValueError("Unsupported WAV format %d: %s" % (tag, path))
+
+    # streamed files may leave the data length unset
+    clen = min(clen, os.path.getsize(path) - offset)
+    nbytes = (bits + 7) // 8
+    frames = clen // (nbytes * channels)
+
+    if nbytes == 1:
+        return np.memmap(path, np.uint8, 'r', offset, (frames, channels)), rate, _pcm8
+    if nbytes == 3:
+        return np.memmap(path, np.uint8, 'r', offset, (frames, channels, 3)), rate, _pcm24
+    return np.memmap(path, '<i%d' % nbytes, 'r', offset, (frames, channels)), rate, None
+
+
+class PCMStream(object):
+    # (frames, channels) sample array consumed through a cursor; with
+    # convert, each row is converted as it is read so that packed sample
+    # formats can stay memory mapped
+
+    def __init__(self, data, channels=2, rate=None, convert=None):
+        data = np.asanyarray(data)
+        if data.ndim == 1:
+            data = data.reshape(-1, channels)
+        self.data = data
+        self.channels = data.shape[1]
+        self.rate = rate
+        self.convert = convert
+        self.pos = 0
+
+    @classmethod
+    def from_raw(cls, path, channels=2, dtype='<i2', offset=0, rate=None):
+        return cls(np.memmap(path, dtype, 'r', offset), channels, rate)
+
+    @classmethod
+    def from_wav(cls, path):
+        data, rate, convert = read_wav(path)
+        return cls(data, rate=rate, convert=convert)
+
+    def __len__(self):
+        return len(self.data)
+
+    def count(self):
+        return len(self.data) - self.pos
+
+    def empty(self):
+        return self.pos >= len(self.data)
+
+    def get(self):
+        d = self.data[self.pos]
+        self.pos += 1
+        if self.convert is not None:
+            d = self.convert(d)
+        return d
+
+    def rewind(self):
+        self.pos = 0
+
+
+class I2SCapture(object):
+    # received frames written into a NumPy buffer, either preallocated or
+    # grown in chunks, with the completion time of each frame
+
+    def __init__(self, buf=None, channels=2, chunk_length=4096, dtype=np.int64):
+        self.growable = buf is None
+        if buf is None:
+            buf = np.zeros((chunk_length, channels), dtype)
+        self.buf = buf
+        self.times = np.zeros(len(buf), np.int64)
+        self.chunk_length = chunk_length
+        self.length = 0
+        self.dropped = 0
+
+    def write(self, frame, t):
+        n = self.length
+        if n >= len(self.buf):
+            if not self.growable:
+                self.dropped += 1
+                return
+            size = n + max(self.chunk_length, n)
+            buf = np.zeros((size,) + self.buf.shape[1:], self.buf.dtype)
+            buf[:n] = self.buf
+            times = np.zeros(size, np.int64)
+            times[:n] = self.times
+            self.buf, self.times = buf, times
+        self.buf[n] = frame
+        self.times[n] = t
+        self.length = n + 1
+
+    def data(self):
+        return self.buf[:self.length]
+
+    def frame_times(self):
+        return self.times[:self.length]
+
+    def periods(self):
+        # ws periods in simulation time units
+        return np.diff(self.frame_times())
+
+    def frame_rate(self, timescale=1e-9):
+        # mean frame rate in Hz, timescale is seconds per time unit
+        p = self.periods()
+        if len(p) == 0:
+            return None
+        return 1 / (p.mean() * timescale)
+
+    def __len__(self):
+        return self.length
+
+    def count(self):
+        return self.length
+
+    def empty(self):
+        return self.length == 0
+
+    def clear(self):
+        self.length = 0
+        self.dropped = 0
+
 
 def I2SControl(clk, rst,
                sck=None,
                ws=None,
                width=16,
-               prescale=2):
-    
+               prescale=2,
+               slots=2):
+
+    # ws is low for slot 0 and high for the rest of the frame, so two slots
+    # is I2S and more is TDM
+
     @instance
     def logic():
-        prescale_cnt = 0
         ws_cnt = 0
+        slot = 0
 
-        while True:
-            yield clk.posedge
+        # measure the clock period so sck edges can be scheduled directly
+        # instead of counting prescale on every clock edge
+        yield clk.posedge
+        t = now()
+        yield clk.posedge
+        period = now() - t
 
+        while True:
             if rst:
                 sck.next = 0
                 ws.next = 0
-                prescale_cnt = 0
                 ws_cnt = 0
-            else:
-                if prescale_cnt > 0:
-                    prescale_cnt = prescale_cnt - 1;
+                slot = 0
+
+                yield rst.negedge
+                yield clk.posedge
+                continue
+
+            if sck:
+                sck.next = False
+                if ws_cnt > 0:
+                    ws_cnt = ws_cnt - 1
                 else:
-                    prescale_cnt = prescale;
-                    if sck:
-                        sck.next = False
-                        if ws_cnt > 0:
-                            ws_cnt = ws_cnt - 1
-                        else:
-                            ws_cnt = width-1
-                            ws.next = not ws
-                    else:
-                        sck.next = True
+                    ws_cnt = width-1
+                    slot = 0 if slot == slots-1 else slot+1
+                    ws.next = slot != 0
+            else:
+                sck.next = True
+
+            # next edge is prescale+1 clock cycles out; land mid-cycle and
+            # resync to the clock
+            yield delay((prescale+1)*period - period//2), rst.posedge
+            yield clk.posedge
 
     return instances()
 
@@ -67,23 +245,41 @@ def I2SSource(clk, rst,
               sd=None,
               width=16,
               fifo=None,
-              name=None):
-    
+              name=None,
+              slots=2,
+              slot_width=None):
+
+    # frames are tuples or array rows of one sample per slot; slots after
+    # the first two are counted out in slot_width bit clocks
+
+    if isinstance(fifo, np.ndarray):
+        fifo = PCMStream(fifo, slots)
+    stream = fifo if isinstance(fifo, PCMStream) else None
+
+    if slot_width is None:
+        slot_width = width
+
     @instance
     def logic():
         lst = None
-        r_data = 0
+        frame = [0]*slots
+        slot = 0
+        slot_bit_cnt = 0
         bit_cnt = 0
         last_sck = 0
         last_ws = 0
         sreg = 0
 
         while True:
+            # only sck edges matter; sample on the following clock edge
+            yield sck.posedge, sck.negedge, rst.posedge
             yield clk.posedge
 
             if rst:
                 sd.next = 0
-                r_data = 0
+                frame = [0]*slots
+                slot = 0
+                slot_bit_cnt = 0
                 bit_cnt = 0
                 last_sck = 0
                 last_ws = 0
@@ -92,22 +288,35 @@ def I2SSource(clk, rst,
                 if not last_sck and sck:
                     if last_ws != ws:
                         bit_cnt = width
+                        slot_bit_cnt = slot_width-1
 
                         if ws:
-                            sreg = r_data
+                            slot = 1
                         else:
-                            d = (0,0)
-                            if lst is None or len(lst) == 0:
-                                if not fifo.empty():
-                                    d = fifo.get(False)
-                                if type(d) is list:
-                                    lst = d
-                                    d = lst.pop(0)
-                            else:
-                                d = lst.pop(0)
-                            sreg, r_data = d
-                            if name is not None:
-                                print("[%s] Sending I2S data (%d, %d)" % (name, sreg, r_data))
+                            slot = 0
+                            d = (0,)*slots
+                            if stream is None and (lst is None or lst.empty()) and not fifo.empty():
+                                d = fifo.get(False)
+                                if isinstance(d, (list, np.ndarray, PCMStream)):
+                                    lst = d if isinstance(d, PCMStream) else PCMStream(d, slots)
+                                    d = (0,)*slots
+                            src = stream if stream is not None else lst
+                            if src is not None and not src.empty():
+                                d = src.get()
+                            mask = (1 << int(width)) - 1
+                            frame = [int(v) & mask for v in d]
+                            if name is not None and logger.isEnabledFor(logging.DEBUG):
+                                logger.debug("[%s] Sending I2S data %s", name, tuple(frame))
+
+                        sreg = frame[slot]
+                    elif slot_bit_cnt > 0:
+                        slot_bit_cnt = slot_bit_cnt - 1
+                    elif 0 < slot < slots-1:
+                        # next TDM slot
+                        slot = slot + 1
+                        bit_cnt = width
+                        slot_bit_cnt = slot_width-1
+                        sreg = frame[slot]
 
                     last_ws = int(ws)
 
@@ -128,11 +337,27 @@ def I2SSink(clk, rst,
             sd=None,
             width=16,
             fifo=None,
-            name=None):
-    
+            name=None,
+            slots=2,
+            slot_width=None):
+
+    # one tuple of slots samples per frame; use an I2SCapture with
+    # channels=slots to collect a (frames, slots) array
+
+    if isinstance(fifo, I2SCapture):
+        write = fifo.write
+    else:
+        def write(d, t):
+            fifo.put(d)
+
+    if slot_width is None:
+        slot_width = width
+
     @instance
     def logic():
-        l_data = 0
+        frame = [0]*slots
+        slot = 0
+        slot_bit_cnt = 0
         bit_cnt = 0
         last_sck = 0
         last_ws = 0
@@ -140,10 +365,13 @@ def I2SSink(clk, rst,
         sreg = 0
 
         while True:
+            yield sck.posedge, sck.negedge, rst.posedge
             yield clk.posedge
 
             if rst:
-                l_data = 0
+                frame = [0]*slots
+                slot = 0
+                slot_bit_cnt = 0
                 bit_cnt = 0
                 last_sck = 0
                 last_ws = 0
@@ -153,19 +381,29 @@ def I2SSink(clk, rst,
                 if not last_sck and sck:
                     if last_ws2 != last_ws:
                         bit_cnt = width-1
+                        slot = last_ws
+                        slot_bit_cnt = slot_width-1
                         sreg = int(sd)
-                    elif bit_cnt > 0:
-                        if bit_cnt > 1:
-                            sreg = (sreg << 1) | int(sd)
-                        elif last_ws2:
-                            d = (sreg << 1) | int(sd)
-                            fifo.put((l_data, d))
-                            if name is not None:
-                                print("[%s] Got I2S data (%d, %d)" % (name, l_data, d))
-                        else:
-                            l_data = (sreg << 1) | int(sd)
+                    elif slot_bit_cnt == 0 and 0 < slot < slots-1:
+                        # next TDM slot
+                        bit_cnt = width-1
+                        slot = slot + 1
+                        slot_bit_cnt = slot_width-1
+                        sreg = int(sd)
+                    else:
+                        if slot_bit_cnt > 0:
+                            slot_bit_cnt = slot_bit_cnt - 1
+                        if bit_cnt > 0:
+                            if bit_cnt > 1:
+                                sreg = (sreg << 1) | int(sd)
+                            else:
+                                frame[slot] = (sreg << 1) | int(sd)
+                                if slot == slots-1:
+                                    write(tuple(frame), now())
+                                    if name is not None and logger.isEnabledFor(logging.DEBUG):
+                                        logger.debug("[%s] Got I2S data %s", name, tuple(frame))
 
-                        bit_cnt = bit_cnt - 1
+                            bit_cnt = bit_cnt - 1
 
                     last_ws2 = last_ws
                     last_ws = int(ws)
@@ -173,4 +411,3 @@ def I2SSink(clk, rst,
                 last_sck = int(sck)
 
     return instances()
-
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2014-2018 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+# Run testbenches in parallel, each in its own scratch directory so the
+# waveform dumps and other per-run files of different benches never collide.
+#
+# A bench may declare parameter sets as a module level dict, e.g.
+#
+#   param_sets = {'stereo': {}, 'tdm8': {'SLOTS': 8}}
+#
+# Each set is run as a separate job, test_bench(**params), in
+# <build-dir>/<bench>/<set>/ and reported as <bench>/<set>.
+#
+# usage: python run_tests.py [-j jobs] [--build-dir dir] [bench[/set] ...]
+
+import argparse
+import fnmatch
+import glob
+import importlib
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import traceback
+
+tb_dir = os.path.dirname(os.path.abspath(__file__))
+
+def _match(name, pattern):
+    return fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(name, 'test_'+pattern)
+
+def find_benches(patterns=None):
+    names = sorted(os.path.splitext(os.path.basename(f))[0]
+        for f in glob.glob(os.path.join(tb_dir, 'test_*.py')))
+    if patterns:
+        names = [n for n in names if any(_match(n, p.split('/')[0]) for p in patterns)]
+    return names
+
+def find_jobs(names, patterns=None):
+    # (label, bench, params) for every parameter set of every bench
+    if tb_dir not in sys.path:
+        sys.path.insert(0, tb_dir)
+    jobs = []
+    for name in names:
+        sets = getattr(importlib.import_module(name), 'param_sets', None)
+        if not sets:
+            if not patterns or any('/' not in p and _match(name, p) for p in patterns):
+                jobs.append((name, name, {}))
+            continue
+        for set_name, params in sets.items():
+            label = '%s/%s' % (name, set_name)
+            # a pattern without /set selects every set of its benches
+            if patterns and not any(_match(label if '/' in p else name, p) for p in patterns):
+                continue
+            jobs.append((label, name, params))
+    return jobs
+
+def run_bench(args):
+    label, name, params, build_dir = args
+
+    scratch = os.path.join(build_dir, label)
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    os.chdir(scratch)
+
+    # send everything, including output from vvp, to a per-bench log
+    log_name = os.path.join(scratch, 'output.log')
+    log = open(log_name, 'w')
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+
+    start = time.time()
+    try:
+        if tb_dir not in sys.path:
+            sys.path.insert(0, tb_dir)
+        importlib.import_module(name).test_bench(**params)
+        ok = True
+    except BaseException:
+        traceback.print_exc()
+        ok = False
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    return label, ok, time.time() - start, log_name
+
+def tail(path, n=20):
+    with open(path) as f:
+        return ''.join(f.readlines()[-n:])
+
+def main():
+    parser = argparse.ArgumentParser(description="Run testbenches in parallel")
+    parser.add_argument('benches', nargs='*', help="bench names or patterns, optionally with /set (default all)")
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--build-dir', default=os.path.join(tb_dir, 'sim_build'))
+
+    args = parser.parse_args()
+
+    jobs = find_jobs(find_benches(args.benches), args.benches)
+    build_dir = os.path.abspath(args.build_dir)
+
+    start = time.time()
+    results = []
+
+    # one fresh process per job; simulator state is global
+    pool = multiprocessing.Pool(min(args.jobs, len(jobs)) or 1, maxtasksperchild=1)
+    try:
+        for name, ok, t, log_name in pool.imap_unordered(run_bench, [job + (build_dir,) for job in jobs]):
+            results.append((name, ok, t, log_name))
+            print("%-30s %-4s %8.1f s" % (name, "PASS" if ok else "FAIL", t))
+            sys.stdout.flush()
+    finally:
+        pool.close()
+        pool.join()
+
+    failed = [r for r in results if not r[1]]
+
+    for name, ok, t, log_name in failed:
+        print("\n==== %s (%s) ====" % (name, log_name))
+        print(tail(log_name))
+
+    print("%d passed, %d failed in %.1f s with %d jobs" % (len(results)-len(failed), len(failed), time.time()-start, args.jobs))
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
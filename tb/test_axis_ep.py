@@ -0,0 +1,648 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2014-2018 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from myhdl import *
+
+import numpy as np
+
+import axis_ep
+
+def bench():
+
+    # Inputs
+    clk = Signal(bool(0))
+    rst = Signal(bool(0))
+    current_test = Signal(intbv(0)[8:])
+
+    # 64 bit bus, 4 lanes of 16 bits
+    tdata = Signal(intbv(0)[64:])
+    tkeep = Signal(intbv(0)[4:])
+    tvalid = Signal(bool(0))
+    tready = Signal(bool(0))
+    tlast = Signal(bool(0))
+    tid = Signal(intbv(0)[8:])
+    tdest = Signal(intbv(0)[8:])
+    tuser = Signal(intbv(0)[2:])
+
+    # multiple tdata signals
+    iq_i_tdata = Signal(intbv(0)[16:])
+    iq_q_tdata = Signal(intbv(0)[16:])
+    iq_tvalid = Signal(bool(0))
+    iq_tready = Signal(bool(0))
+    iq_tlast = Signal(bool(0))
+
+    # 256 bit bus, 16 lanes of 16 bits
+    wide_tdata = Signal(intbv(0)[256:])
+    wide_tkeep = Signal(intbv(0)[16:])
+    wide_tvalid = Signal(bool(0))
+    wide_tready = Signal(bool(0))
+    wide_tlast = Signal(bool(0))
+
+    # single lane 64 bit bus with 64 bit tuser, and 96 bit bus
+    long_tdata = Signal(intbv(0)[64:])
+    long_tvalid = Signal(bool(0))
+    long_tready = Signal(bool(0))
+    long_tlast = Signal(bool(0))
+    long_tuser = Signal(intbv(0)[64:])
+
+    huge_tdata = Signal(intbv(0)[96:])
+    huge_tvalid = Signal(bool(0))
+    huge_tready = Signal(bool(0))
+    huge_tlast = Signal(bool(0))
+
+    # sources and sinks
+    source = axis_ep.AXIStreamSource()
+
+    source_logic = source.create_logic(
+        clk,
+        rst,
+        tdata=tdata,
+        tkeep=tkeep,
+        tvalid=tvalid,
+        tready=tready,
+        tlast=tlast,
+        tid=tid,
+        tdest=tdest,
+        tuser=tuser,
+        name='source'
+    )
+
+    sink = axis_ep.AXIStreamSink()
+
+    sink_logic = sink.create_logic(
+        clk,
+        rst,
+        tdata=tdata,
+        tkeep=tkeep,
+        tvalid=tvalid,
+        tready=tready,
+        tlast=tlast,
+        tid=tid,
+        tdest=tdest,
+        tuser=tuser,
+        name='sink'
+    )
+
+    iq_source = axis_ep.AXIStreamSource()
+
+    iq_source_logic = iq_source.create_logic(
+        clk,
+        rst,
+        tdata=(iq_i_tdata, iq_q_tdata),
+        tvalid=iq_tvalid,
+        tready=iq_tready,
+        tlast=iq_tlast,
+        pause=axis_ep.pause_periodic(4, 1),
+        name='iq_source'
+    )
+
+    iq_sink = axis_ep.AXIStreamSink()
+
+    iq_sink_logic = iq_sink.create_logic(
+        clk,
+        rst,
+        tdata=(iq_i_tdata, iq_q_tdata),
+        tvalid=iq_tvalid,
+        tready=iq_tready,
+        tlast=iq_tlast,
+        pause=axis_ep.pause_random(0.3, seed=1),
+        name='iq_sink'
+    )
+
+    wide_source = axis_ep.AXIStreamSource()
+
+    wide_source_logic = wide_source.create_logic(
+        clk,
+        rst,
+        tdata=wide_tdata,
+        tkeep=wide_tkeep,
+        tvalid=wide_tvalid,
+        tready=wide_tready,
+        tlast=wide_tlast,
+        pause=axis_ep.pause_bursts([(3, 1), (1, 2)]),
+        signed=True,
+        overflow='saturate',
+        name='wide_source'
+    )
+
+    wide_sink = axis_ep.AXIStreamSink()
+
+    wide_sink_logic = wide_sink.create_logic(
+        clk,
+        rst,
+        tdata=wide_tdata,
+        tkeep=wide_tkeep,
+        tvalid=wide_tvalid,
+        tready=wide_tready,
+        tlast=wide_tlast,
+        signed=True,
+        name='wide_sink'
+    )
+
+    long_source = axis_ep.AXIStreamSource()
+
+    long_source_logic = long_source.create_logic(
+        clk,
+        rst,
+        tdata=long_tdata,
+        tvalid=long_tvalid,
+        tready=long_tready,
+        tlast=long_tlast,
+        tuser=long_tuser,
+        name='long_source'
+    )
+
+    long_sink = axis_ep.AXIStreamSink()
+
+    long_sink_logic = long_sink.create_logic(
+        clk,
+        rst,
+        tdata=long_tdata,
+        tvalid=long_tvalid,
+        tready=long_tready,
+        tlast=long_tlast,
+        tuser=long_tuser,
+        name='long_sink'
+    )
+
+    huge_source = axis_ep.AXIStreamSource()
+
+    huge_source_logic = huge_source.create_logic(
+        clk,
+        rst,
+        tdata=huge_tdata,
+        tvalid=huge_tvalid,
+        tready=huge_tready,
+        tlast=huge_tlast,
+        name='huge_source'
+    )
+
+    huge_sink = axis_ep.AXIStreamSink()
+
+    huge_sink_logic = huge_sink.create_logic(
+        clk,
+        rst,
+        tdata=huge_tdata,
+        tvalid=huge_tvalid,
+        tready=huge_tready,
+        tlast=huge_tlast,
+        name='huge_sink'
+    )
+
+    @always(delay(4))
+    def clkgen():
+        clk.next = not clk
+
+    @instance
+    def check():
+        yield delay(100)
+        yield clk.posedge
+        rst.next = 1
+        yield clk.posedge
+        rst.next = 0
+        yield clk.posedge
+        yield delay(100)
+        yield clk.posedge
+
+        yield clk.posedge
+        print("test 1: list frame")
+        current_test.next = 1
+
+        test_frame = axis_ep.AXIStreamFrame(list(range(16)), id=1, dest=2)
+        source.send(test_frame)
+        source.send(test_frame)
+
+        while sink.count() < 2:
+            yield clk.posedge
+
+        rx_frame = sink.recv()
+
+        assert rx_frame == test_frame
+        assert list(rx_frame.keep) == [0xf]*4
+
+        rx_frame = sink.recv()
+
+        assert rx_frame == test_frame
+
+        # the copies sent share build results with test_frame
+        assert len(test_frame._cache) == 1
+        tdata = list(test_frame._cache.values())[0][1][0]
+
+        source.send(test_frame)
+
+        while sink.empty():
+            yield clk.posedge
+
+        assert sink.recv() == test_frame
+        assert len(test_frame._cache) == 1
+        assert list(test_frame._cache.values())[0][1][0] is tdata
+
+        # the sent payload is read-only, so it can't go stale in the cache
+        try:
+            test_frame.data[0] = 99
+        except ValueError:
+            pass
+        else:
+            assert False
+
+        # payloads the frame doesn't own are checked for in-place edits
+        y = np.arange(16)
+        test_frame = axis_ep.AXIStreamFrame(y, copy=False)
+        byte_frame = axis_ep.AXIStreamFrame(b'abcd')
+
+        for k in range(2):
+            source.send(test_frame, copy=False)
+            source.send(byte_frame, copy=False)
+
+            while sink.count() < 2:
+                yield clk.posedge
+
+            assert sink.recv().data.tolist() == [99*k] + list(range(1, 16))
+            assert sink.recv().data.tolist() == list(b'xbcd' if k else b'abcd')
+
+            y[0] = 99
+            byte_frame.data[0] = ord('x')
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 2: numpy frame with partial last cycle")
+        current_test.next = 2
+
+        y = np.arange(0, 2**16, 4500, dtype=np.uint16)
+        test_frame = axis_ep.AXIStreamFrame(y, id=3, dest=4, last_cycle_user=1, copy=False)
+        assert test_frame.data is y
+        source.send(test_frame, copy=False)
+
+        while sink.empty():
+            yield clk.posedge
+
+        rx_frame = sink.recv()
+
+        assert rx_frame == test_frame
+        assert rx_frame.data.dtype == np.uint16
+
+        bad_frame = axis_ep.AXIStreamFrame(y, id=3, dest=4, last_cycle_user=1)
+        bad_frame.data[9] = 1
+        assert rx_frame.compare(bad_frame) == ('data', 9, y[9], 1)
+        assert np.array_equal(rx_frame.data, y)
+        assert rx_frame.keep[-1] == (1 << (len(y) % 4))-1
+        assert rx_frame.last_cycle_user == 1
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 3: back to back with pauses")
+        current_test.next = 3
+
+        test_frames = [axis_ep.AXIStreamFrame(np.arange(k, 4*k+1)) for k in range(1, 6)]
+        for f in test_frames:
+            source.send(f)
+
+        # source paused in the first and sink in the second of every 3 cycles
+        source.reset_stats()
+        source.set_pause(axis_ep.pause_periodic(3, 1))
+        sink.set_pause(axis_ep.pause_periodic(3, 1, 2))
+
+        while sink.count() < len(test_frames):
+            yield clk.posedge
+
+        source.set_pause(None)
+        sink.set_pause(None)
+
+        stats = source.get_stats()
+
+        assert stats.starve_cycles > 0
+        assert stats.stall_cycles > 0
+
+        for f in test_frames:
+            rx_frame = sink.recv()
+            assert rx_frame == f
+
+        assert sink.empty()
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 4: multiple tdata signals")
+        current_test.next = 4
+
+        i_data = list(range(20))
+        q_data = list(range(20, 40))
+
+        test_frame = axis_ep.AXIStreamFrame(zip(i_data, q_data))
+        iq_source.reset_stats()
+        iq_sink.reset_stats()
+        iq_source.send(test_frame)
+
+        while iq_sink.empty():
+            yield clk.posedge
+
+        rx_frame = iq_sink.recv()
+
+        assert rx_frame == test_frame
+        assert [tuple(p) for p in rx_frame.data] == list(zip(i_data, q_data))
+
+        # source paused 1 cycle in 4, so tvalid is high at most 3 in 4
+        stats = iq_source.get_stats()
+        print(stats)
+
+        assert stats.beats == 20
+        assert stats.beats + stats.stall_cycles <= 3*((stats.cycles+3)//4)
+        assert stats.starve_cycles > 0
+
+        # sink paused at random, so some beats stall
+        stats = iq_sink.get_stats()
+
+        assert stats.beats == 20
+        assert 0 < stats.stall_cycles < stats.beats
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 5: wide bus")
+        current_test.next = 5
+
+        y = np.r_[np.arange(-500, 500, 7), 40000, -40000]
+        test_frame = axis_ep.AXIStreamFrame(y)
+        wide_source.reset_stats()
+        wide_source.send(test_frame)
+
+        while wide_sink.empty():
+            yield clk.posedge
+
+        rx_frame = wide_sink.recv()
+
+        # bursts of 3 and 1 cycles with gaps of 1 and 2: the 10 beats span
+        # at least 6 paused cycles, and the sink never pauses
+        stats = wide_source.get_stats()
+        print(stats)
+
+        assert stats.beats == 10
+        assert stats.stall_cycles == 0
+        assert stats.starve_cycles >= 6
+        assert stats.beats <= 4*((stats.cycles+6)//7)
+
+        # signed 16 bit stream, saturated on send
+        assert np.array_equal(rx_frame.data, np.clip(y, -2**15, 2**15-1))
+        assert len(rx_frame.keep) == (len(y)+15) // 16
+        assert rx_frame.keep[-1] == 2**(len(y) % 16)-1
+
+        # unsigned 64 bit values past the int64 range saturate high
+        wide_source.send(np.array([5, 2**63, 2**64-1], dtype=np.uint64))
+
+        while wide_sink.empty():
+            yield clk.posedge
+
+        rx_frame = wide_sink.recv()
+
+        assert list(rx_frame.data) == [5, 2**15-1, 2**15-1]
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 6: sample stream")
+        current_test.next = 6
+
+        def samples():
+            yield np.arange(0, 10)
+            for k in range(10, 15):
+                yield k
+            yield np.arange(15, 40)
+
+        source.send_stream(samples(), frame_length=12, chunk_length=8)
+
+        while tvalid or not source.empty():
+            yield clk.posedge
+
+        yield clk.posedge
+
+        lst = []
+
+        while not sink.empty():
+            rx_frame = sink.recv()
+            assert len(rx_frame.data) == 12 or sink.empty()
+            lst.extend(rx_frame.data)
+
+        assert lst == list(range(40))
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 7: continuous multiple tdata stream")
+        current_test.next = 7
+
+        iq_source.send_stream(((k, 100-k) for k in range(100)), chunk_length=16)
+
+        while iq_sink.empty():
+            yield clk.posedge
+
+        rx_frame = iq_sink.recv()
+
+        assert [tuple(p) for p in rx_frame.data] == [(k, 100-k) for k in range(100)]
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 8: ring buffer consumer")
+        current_test.next = 8
+
+        ring = axis_ep.RingBuffer(np.zeros(32, dtype=np.uint16))
+        chunks = []
+
+        def consume(frame):
+            chunks.append(len(frame.data))
+            ring.write(frame)
+
+        sink.set_callback(consume, chunk_length=8)
+
+        source.send_stream(iter(np.arange(100)), chunk_length=16)
+
+        while tvalid or not source.empty():
+            yield clk.posedge
+
+        yield clk.posedge
+
+        sink.set_callback(None)
+
+        assert sink.empty()
+        assert chunks == [8]*12+[4]
+        assert ring.count == 100
+        assert list(ring.latest()) == list(range(68, 100))
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 9: chunked read")
+        current_test.next = 9
+
+        for k in range(3):
+            source.send(np.arange(10*k, 10*k+10))
+
+        while tvalid or not source.empty():
+            yield clk.posedge
+
+        yield clk.posedge
+
+        assert list(sink.read(7)) == list(range(7))
+        buf = np.zeros(16, dtype=np.uint16)
+        assert sink.read_into(buf) == 16
+        assert list(buf) == list(range(7, 23))
+        assert list(sink.read()) == list(range(23, 30))
+        assert len(sink.read()) == 0
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 10: throughput counters")
+        current_test.next = 10
+
+        source.reset_stats()
+        sink.reset_stats()
+
+        source.send(np.arange(64))
+
+        while sink.empty():
+            yield clk.posedge
+
+        stats = source.get_stats()
+        print(stats)
+
+        assert stats.beats == 16
+        assert stats.frames == 1
+        assert stats.stall_cycles == 0
+
+        stats = sink.get_stats()
+
+        assert stats.beats == 16
+        assert stats.frames == 1
+        assert stats.utilization() > 0.5
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 11: latency tracking")
+        current_test.next = 11
+
+        sink.read()
+
+        source.track_times()
+        sink.track_times()
+
+        source.send(np.arange(30))
+        source.send(np.arange(30))
+
+        while sink.count() < 2:
+            yield clk.posedge
+
+        sink.read()
+
+        # direct loopback, so every sample arrives in the cycle it is sent
+        lat = axis_ep.measure_latency(source, sink, period=8)
+        print(lat)
+
+        assert lat.count == 60
+        assert lat.min == 0 and lat.max == 0
+        assert lat.histogram() == [(0, 60)]
+        times = sink.times
+        assert len(times.frame_end) == 2
+
+        source.track_times(False)
+        sink.track_times(False)
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 12: complex IQ frame")
+        current_test.next = 12
+
+        x = np.arange(64)
+        iq = np.round(np.exp(2j*np.pi*x/16)*1000)
+
+        iq_source.send(axis_ep.AXIStreamFrame(iq))
+
+        while iq_sink.empty():
+            yield clk.posedge
+
+        rx_frame = iq_sink.recv()
+
+        assert rx_frame.data.shape == (64, 2)
+        assert np.array_equal(rx_frame.as_complex(), iq)
+
+        # streamed as complex chunks and complex scalars
+        def samples():
+            yield iq[:30]
+            for k in range(30, 34):
+                yield iq[k]
+            yield iq[34:]
+
+        iq_source.send_stream(samples(), chunk_length=16)
+
+        while iq_sink.empty():
+            yield clk.posedge
+
+        rx_frame = iq_sink.recv()
+
+        assert rx_frame.data.shape == (64, 2)
+        assert np.array_equal(rx_frame.as_complex(), iq)
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 13: 64 bit and wider values")
+        current_test.next = 13
+
+        # Python ints past the int64 range mixed with small ones
+        y = [2**64-1, 2**63+5, 1]
+        long_source.send(axis_ep.AXIStreamFrame(y, user=[2**63, 2**64-2, 3]))
+
+        y_huge = [2**96-1, 2**64+7, 2**63+5, 1]
+        huge_source.send(axis_ep.AXIStreamFrame(y_huge))
+
+        while long_sink.empty() or huge_sink.empty():
+            yield clk.posedge
+
+        rx_frame = long_sink.recv()
+
+        assert rx_frame.data.tolist() == y
+        assert rx_frame.user.tolist() == [2**63, 2**64-2, 3]
+
+        rx_frame = huge_sink.recv()
+
+        assert rx_frame.data.tolist() == y_huge
+
+        yield delay(100)
+
+        raise StopSimulation
+
+    return instances()
+
+def test_bench():
+    sim = Simulation(bench())
+    sim.run()
+
+if __name__ == '__main__':
+    print("Running test...")
+    test_bench()
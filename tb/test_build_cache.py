@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2015 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import os
+import shutil
+import tempfile
+
+import build_cache
+import cosim
+
+wrapper = """
+module test_dut;
+
+reg clk = 0;
+reg [7:0] input_tdata = 0;
+wire [7:0] output_tdata;
+
+initial begin
+    // myhdl integration
+    $from_myhdl(clk,
+                input_tdata); // $to_myhdl(not_a_port)
+    /* $from_myhdl(commented_out); */
+    $to_myhdl(output_tdata);
+end
+
+`include "dump.vh"
+
+endmodule
+"""
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+def test_bench():
+    tmp = tempfile.mkdtemp()
+
+    tb_dir = build_cache.tb_dir
+    version = build_cache._iverilog_version
+
+    try:
+        # two copies of the same tree in different places
+        for d in ('a', 'b'):
+            os.makedirs(os.path.join(tmp, d, 'tb'))
+            os.makedirs(os.path.join(tmp, d, 'rtl'))
+            write(os.path.join(tmp, d, 'tb', 'test_dut.v'), wrapper)
+            write(os.path.join(tmp, d, 'tb', 'dump.vh'), "// dump\n")
+            write(os.path.join(tmp, d, 'rtl', 'dut.v'), "module dut; endmodule\n")
+
+        srcs = ["../rtl/dut.v", "test_dut.v"]
+
+        build_cache._iverilog_version = "Icarus Verilog version 12.0 (stable)"
+
+        def key(d, **kwargs):
+            build_cache.tb_dir = os.path.join(tmp, d, 'tb')
+            args = dict(srcs=srcs, toplevel='test_dut', includes=['.'])
+            args.update(kwargs)
+            return build_cache.build_key(**args)
+
+        print("test 1: stable key")
+
+        k = key('a')
+
+        assert k == key('a')
+        assert key('a', params={'WIDTH': 8, 'SLOTS': 2}) == key('a', params={'SLOTS': 2, 'WIDTH': 8})
+
+        print("test 2: location independent")
+
+        # same tree elsewhere, and absolute paths, give the same key
+        assert key('b') == k
+        assert key('a', srcs=[os.path.join(tmp, 'a', 'tb', s) for s in srcs]) == k
+        assert key('a', includes=[os.path.join(tmp, 'a', 'tb')]) == k
+
+        print("test 3: build inputs")
+
+        assert key('a', params={'WIDTH': 16}) != k
+        assert key('a', defines={'FOO': 1}) != k
+        assert key('a', flags=['-g2012']) != k
+
+        write(os.path.join(tmp, 'b', 'rtl', 'dut.v'), "module dut; wire x; endmodule\n")
+        assert key('b') != k
+
+        write(os.path.join(tmp, 'b', 'rtl', 'dut.v'), "module dut; endmodule\n")
+        write(os.path.join(tmp, 'b', 'tb', 'dump.vh'), "// dump 2\n")
+        assert key('b') != k
+
+        print("test 4: compiler version")
+
+        build_cache._iverilog_version = "Icarus Verilog version 11.0 (stable)"
+        assert key('a') != k
+
+        print("test 5: wrapper ports")
+
+        path = os.path.join(tmp, 'a', 'tb', 'test_dut.v')
+        from_ports, to_ports = cosim.myhdl_ports(path)
+
+        assert from_ports == ['clk', 'input_tdata']
+        assert to_ports == ['output_tdata']
+
+        # relative to tb/
+        build_cache.tb_dir = tb_dir
+        from_ports, to_ports = cosim.myhdl_ports('test_i2s_rx.v')
+
+        assert from_ports == ['clk', 'rst', 'current_test', 'sck', 'ws', 'sd', 'output_tready']
+        assert to_ports == ['output_l_tdata', 'output_r_tdata', 'output_tdata', 'output_tvalid']
+
+    finally:
+        build_cache.tb_dir = tb_dir
+        build_cache._iverilog_version = version
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    print("Running test...")
+    test_bench()
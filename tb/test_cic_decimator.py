@@ -24,17 +24,12 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
-
-try:
-    from queue import Queue
-except ImportError:
-    from Queue import Queue
 
 import numpy as np
 import math
 
 import axis_ep
+import cosim
 
 module = 'cic_decimator'
 
@@ -43,35 +38,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_cic_decimator(clk,
-                      rst,
-                      current_test,
-                      input_tdata,
-                      input_tvalid,
-                      input_tready,
-                      output_tdata,
-                      output_tvalid,
-                      output_tready,
-                      rate):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-                input_tdata=input_tdata,
-                input_tvalid=input_tvalid,
-                input_tready=input_tready,
-                output_tdata=output_tdata,
-                output_tvalid=output_tvalid,
-                output_tready=output_tready,
-                rate=rate)
-
 def bench():
 
     # Parameters
@@ -97,45 +63,42 @@ def bench():
     output_tvalid = Signal(bool(0))
 
     # sources and sinks
-    input_source_queue = Queue()
-    input_source_pause = Signal(bool(0))
-    output_sink_queue = Queue()
-    output_sink_pause = Signal(bool(0))
-    
-    input_source = axis_ep.AXIStreamSource(clk,
-                                           rst,
-                                           tdata=input_tdata,
-                                           tvalid=input_tvalid,
-                                           tready=input_tready,
-                                           fifo=input_source_queue,
-                                           pause=input_source_pause,
-                                           name='input_source')
-
-    output_sink = axis_ep.AXIStreamSink(clk,
-                                        rst,
-                                        tdata=output_tdata,
-                                        tvalid=output_tvalid,
-                                        tready=output_tready,
-                                        fifo=output_sink_queue,
-                                        pause=output_sink_pause,
-                                        name='output_sink')
+    input_source = axis_ep.AXIStreamSource()
+
+    input_source_logic = input_source.create_logic(
+        clk,
+        rst,
+        tdata=input_tdata,
+        tvalid=input_tvalid,
+        tready=input_tready,
+        signed=True,
+        name='input_source'
+    )
+
+    output_sink = axis_ep.AXIStreamSink()
+
+    output_sink_logic = output_sink.create_logic(
+        clk,
+        rst,
+        tdata=output_tdata,
+        tvalid=output_tvalid,
+        tready=output_tready,
+        signed=True,
+        name='output_sink'
+    )
 
     # DUT
-    dut = dut_cic_decimator(clk,
-                            rst,
-                            current_test,
-                            input_tdata,
-                            input_tvalid,
-                            input_tready,
-                            output_tdata,
-                            output_tvalid,
-                            output_tready,
-                            rate)
+    dut = cosim.dut("test_%s" % module, srcs, params={'WIDTH': WIDTH, 'RMAX': RMAX, 'M': M, 'N': N}, signals=locals())
 
     @always(delay(4))
     def clkgen():
         clk.next = not clk
 
+    def latency(ref, lst):
+        # output k carries ref[k-i], the last input of which is (k-i)*rate-N
+        i = contains(ref, lst)[0]
+        return axis_ep.measure_latency(input_source, output_sink, ratio=int(rate), offset=-(i*int(rate)+N), period=8)
+
     @instance
     def check():
         yield delay(100)
@@ -161,7 +124,10 @@ def bench():
         test_frame = axis_ep.AXIStreamFrame()
         test_frame.data = y + [0]*10
 
-        input_source_queue.put(test_frame)
+        input_source.track_times()
+        output_sink.track_times()
+
+        input_source.send(test_frame)
         
         yield clk.posedge
         yield clk.posedge
@@ -171,15 +137,17 @@ def bench():
 
         yield clk.posedge
 
-        lst = []
-
-        while not output_sink_queue.empty():
-            lst += output_sink_queue.get(False).data
+        lst = output_sink.read().tolist()
 
         print(lst)
         print(ref)
         assert contains(ref, lst)
 
+        lat = latency(ref, lst)
+        print(lat)
+
+        assert lat.min == lat.max
+
         yield delay(100)
 
         yield clk.posedge
@@ -198,7 +166,10 @@ def bench():
         test_frame = axis_ep.AXIStreamFrame()
         test_frame.data = y + [0]*10
         
-        input_source_queue.put(test_frame)
+        input_source.track_times()
+        output_sink.track_times()
+
+        input_source.send(test_frame)
         
         yield clk.posedge
         yield clk.posedge
@@ -208,15 +179,17 @@ def bench():
 
         yield clk.posedge
 
-        lst = []
-
-        while not output_sink_queue.empty():
-            lst += output_sink_queue.get(False).data
+        lst = output_sink.read().tolist()
 
         print(lst)
         print(ref)
         assert contains(ref, lst)
 
+        lat = latency(ref, lst)
+        print(lat)
+
+        assert lat.min == lat.max
+
         yield delay(100)
 
         yield clk.posedge
@@ -235,30 +208,33 @@ def bench():
         test_frame = axis_ep.AXIStreamFrame()
         test_frame.data = y + [0]*10
         
-        input_source_queue.put(test_frame)
-        
+        input_source.track_times()
+        output_sink.track_times()
+
+        input_source.set_pause(axis_ep.pause_periodic(4, 3))
+        input_source.send(test_frame)
+
         yield clk.posedge
         yield clk.posedge
 
-        while input_tvalid:
-            input_source_pause.next = True
-            yield clk.posedge
-            yield clk.posedge
-            yield clk.posedge
-            input_source_pause.next = False
+        # tvalid drops while paused, so wait until it stays low for a period
+        idle = 0
+        while idle < 4:
             yield clk.posedge
+            idle = 0 if input_tvalid else idle+1
 
-        yield clk.posedge
+        input_source.set_pause(None)
 
-        lst = []
+        yield clk.posedge
 
-        while not output_sink_queue.empty():
-            lst += output_sink_queue.get(False).data
+        lst = output_sink.read().tolist()
 
         print(lst)
         print(ref)
         assert contains(ref, lst)
 
+        print(latency(ref, lst))
+
         yield delay(100)
 
         yield clk.posedge
@@ -277,30 +253,30 @@ def bench():
         test_frame = axis_ep.AXIStreamFrame()
         test_frame.data = y + [0]*10
         
-        input_source_queue.put(test_frame)
-        
+        input_source.track_times()
+        output_sink.track_times()
+
+        output_sink.set_pause(axis_ep.pause_periodic(4, 3))
+        input_source.send(test_frame)
+
         yield clk.posedge
         yield clk.posedge
 
         while input_tvalid:
-            output_sink_pause.next = True
-            yield clk.posedge
-            yield clk.posedge
-            yield clk.posedge
-            output_sink_pause.next = False
             yield clk.posedge
 
-        yield clk.posedge
+        output_sink.set_pause(None)
 
-        lst = []
+        yield clk.posedge
 
-        while not output_sink_queue.empty():
-            lst += output_sink_queue.get(False).data
+        lst = output_sink.read().tolist()
 
         print(lst)
         print(ref)
         assert contains(ref, lst)
 
+        print(latency(ref, lst))
+
         yield delay(100)
 
         yield clk.posedge
@@ -317,16 +293,12 @@ def bench():
         y = np.r_[(np.sin(2*np.pi*x/50)*1024).astype(int), [0,0,0,0]]
         ref = cic_decimate(y, N, M, rate)
 
-        ys = y
-        ys[y < 0] += 2**WIDTH
-
-        refs = ref
-        refs[ref < 0] += 2**REG_WIDTH
+        test_frame = axis_ep.AXIStreamFrame(np.r_[y, [0]*10])
 
-        test_frame = axis_ep.AXIStreamFrame()
-        test_frame.data = list(map(int, ys)) + [0]*10
+        input_source.track_times()
+        output_sink.track_times()
 
-        input_source_queue.put(test_frame)
+        input_source.send(test_frame)
         
         yield clk.posedge
         yield clk.posedge
@@ -336,15 +308,17 @@ def bench():
 
         yield clk.posedge
 
-        lst = []
-
-        while not output_sink_queue.empty():
-            lst += output_sink_queue.get(False).data
+        lst = output_sink.read().tolist()
 
         print(lst)
         print(ref)
         assert contains(ref, lst)
 
+        lat = latency(ref, lst)
+        print(lat)
+
+        assert lat.min == lat.max
+
         yield delay(100)
 
         yield clk.posedge
@@ -365,16 +339,12 @@ def bench():
         y = np.r_[(np.sin(2*np.pi*x/50)*1024).astype(int), [0]*10]
         ref = cic_decimate(y, N, M, rate)
 
-        ys = y
-        ys[y < 0] += 2**WIDTH
-
-        refs = ref
-        refs[ref < 0] += 2**REG_WIDTH
-
-        test_frame = axis_ep.AXIStreamFrame()
-        test_frame.data = list(map(int, ys)) + [0]*10
+        test_frame = axis_ep.AXIStreamFrame(np.r_[y, [0]*10])
         
-        input_source_queue.put(test_frame)
+        input_source.track_times()
+        output_sink.track_times()
+
+        input_source.send(test_frame)
         
         yield clk.posedge
         yield clk.posedge
@@ -384,15 +354,17 @@ def bench():
 
         yield clk.posedge
 
-        lst = []
-
-        while not output_sink_queue.empty():
-            lst += output_sink_queue.get(False).data
+        lst = output_sink.read().tolist()
 
         print(lst)
         print(ref)
         assert contains(ref, lst)
 
+        lat = latency(ref, lst)
+        print(lat)
+
+        assert lat.min == lat.max
+
         yield delay(100)
 
         yield clk.posedge
@@ -412,16 +384,12 @@ def bench():
         y = np.r_[np.ones(1000).astype(int)*1000, [0]*10]
         ref = cic_decimate(y, N, M, rate)
 
-        ys = y
-        ys[y < 0] += 2**WIDTH
-
-        refs = ref
-        refs[ref < 0] += 2**REG_WIDTH
-
-        test_frame = axis_ep.AXIStreamFrame()
-        test_frame.data = list(map(int, ys)) + [0]*10
+        test_frame = axis_ep.AXIStreamFrame(np.r_[y, [0]*10])
         
-        input_source_queue.put(test_frame)
+        input_source.track_times()
+        output_sink.track_times()
+
+        input_source.send(test_frame)
         
         yield clk.posedge
         yield clk.posedge
@@ -431,15 +399,17 @@ def bench():
 
         yield clk.posedge
 
-        lst = []
-
-        while not output_sink_queue.empty():
-            lst += output_sink_queue.get(False).data
+        lst = output_sink.read().tolist()
 
         print(lst)
         print(ref)
         assert contains(ref, lst)
 
+        lat = latency(ref, lst)
+        print(lat)
+
+        assert lat.min == lat.max
+
         yield delay(100)
 
         raise StopSimulation
@@ -24,7 +24,6 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
 
 try:
     from queue import Queue
@@ -35,6 +34,7 @@ import numpy as np
 import math
 
 import axis_ep
+import cosim
 
 module = 'cic_interpolator'
 
@@ -43,35 +43,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_cic_interpolator(clk,
-                         rst,
-                         current_test,
-                         input_tdata,
-                         input_tvalid,
-                         input_tready,
-                         output_tdata,
-                         output_tvalid,
-                         output_tready,
-                         rate):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-                input_tdata=input_tdata,
-                input_tvalid=input_tvalid,
-                input_tready=input_tready,
-                output_tdata=output_tdata,
-                output_tvalid=output_tvalid,
-                output_tready=output_tready,
-                rate=rate)
-
 def bench():
 
     # Parameters
@@ -121,16 +92,7 @@ def bench():
                                         name='output_sink')
 
     # DUT
-    dut = dut_cic_interpolator(clk,
-                               rst,
-                               current_test,
-                               input_tdata,
-                               input_tvalid,
-                               input_tready,
-                               output_tdata,
-                               output_tvalid,
-                               output_tready,
-                               rate)
+    dut = cosim.dut("test_%s" % module, srcs, params={'WIDTH': WIDTH, 'RMAX': RMAX, 'M': M, 'N': N}, signals=locals())
 
     @always(delay(4))
     def clkgen():
@@ -65,12 +65,13 @@ initial begin
     $to_myhdl(input_tready,
               output_tdata,
               output_tvalid);
-
-    // dump file
-    $dumpfile("test_cic_interpolator.lxt");
-    $dumpvars(0, test_cic_interpolator);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_cic_interpolator
+`include "dump.vh"
+`undef DUMP_TOP
+
 cic_interpolator #(
     .WIDTH(WIDTH),
     .RMAX(RMAX),
@@ -24,7 +24,6 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
 
 try:
     from queue import Queue
@@ -32,6 +31,7 @@ except ImportError:
     from Queue import Queue
 
 import axis_ep
+import cosim
 
 module = 'dsp_iq_mult'
 
@@ -40,45 +40,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_dsp_iq_mult(clk,
-                    rst,
-                    current_test,
-                    input_a_i_tdata,
-                    input_a_q_tdata,
-                    input_a_tvalid,
-                    input_a_tready,
-                    input_b_i_tdata,
-                    input_b_q_tdata,
-                    input_b_tvalid,
-                    input_b_tready,
-                    output_i_tdata,
-                    output_q_tdata,
-                    output_tvalid,
-                    output_tready):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-                input_a_i_tdata=input_a_i_tdata,
-                input_a_q_tdata=input_a_q_tdata,
-                input_a_tvalid=input_a_tvalid,
-                input_a_tready=input_a_tready,
-                input_b_i_tdata=input_b_i_tdata,
-                input_b_q_tdata=input_b_q_tdata,
-                input_b_tvalid=input_b_tvalid,
-                input_b_tready=input_b_tready,
-                output_i_tdata=output_i_tdata,
-                output_q_tdata=output_q_tdata,
-                output_tvalid=output_tvalid,
-                output_tready=output_tready)
-
 def bench():
 
     # Parameters
@@ -140,21 +101,7 @@ def bench():
                                        name='output_sink')
 
     # DUT
-    dut = dut_dsp_iq_mult(clk,
-                          rst,
-                          current_test,
-                          input_a_i_tdata,
-                          input_a_q_tdata,
-                          input_a_tvalid,
-                          input_a_tready,
-                          input_b_i_tdata,
-                          input_b_q_tdata,
-                          input_b_tvalid,
-                          input_b_tready,
-                          output_i_tdata,
-                          output_q_tdata,
-                          output_tvalid,
-                          output_tready)
+    dut = cosim.dut("test_%s" % module, srcs, params={'WIDTH': WIDTH}, signals=locals())
 
     @always(delay(4))
     def clkgen():
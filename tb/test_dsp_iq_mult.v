@@ -71,12 +71,13 @@ initial begin
               output_i_tdata,
               output_q_tdata,
               output_tvalid);
-
-    // dump file
-    $dumpfile("test_dsp_iq_mult.lxt");
-    $dumpvars(0, test_dsp_iq_mult);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_dsp_iq_mult
+`include "dump.vh"
+`undef DUMP_TOP
+
 dsp_iq_mult #(
     .WIDTH(WIDTH)
 )
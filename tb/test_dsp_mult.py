@@ -24,14 +24,9 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
-
-try:
-    from queue import Queue
-except ImportError:
-    from Queue import Queue
 
 import axis_ep
+import cosim
 
 module = 'dsp_mult'
 
@@ -40,39 +35,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_dsp_mult(clk,
-                 rst,
-                 current_test,
-                 input_a_tdata,
-                 input_a_tvalid,
-                 input_a_tready,
-                 input_b_tdata,
-                 input_b_tvalid,
-                 input_b_tready,
-                 output_tdata,
-                 output_tvalid,
-                 output_tready):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-                input_a_tdata=input_a_tdata,
-                input_a_tvalid=input_a_tvalid,
-                input_a_tready=input_a_tready,
-                input_b_tdata=input_b_tdata,
-                input_b_tvalid=input_b_tvalid,
-                input_b_tready=input_b_tready,
-                output_tdata=output_tdata,
-                output_tvalid=output_tvalid,
-                output_tready=output_tready)
-
 def bench():
 
     # Parameters
@@ -96,53 +58,48 @@ def bench():
     output_tvalid = Signal(bool(0))
 
     # sources and sinks
-    input_a_source_queue = Queue()
     input_a_source_pause = Signal(bool(0))
-    input_b_source_queue = Queue()
     input_b_source_pause = Signal(bool(0))
-    output_sink_queue = Queue()
     output_sink_pause = Signal(bool(0))
 
-    input_a_source = axis_ep.AXIStreamSource(clk,
-                                           rst,
-                                           tdata=input_a_tdata,
-                                           tvalid=input_a_tvalid,
-                                           tready=input_a_tready,
-                                           fifo=input_a_source_queue,
-                                           pause=input_a_source_pause,
-                                           name='input_a_source')
-
-    input_b_source = axis_ep.AXIStreamSource(clk,
-                                           rst,
-                                           tdata=input_b_tdata,
-                                           tvalid=input_b_tvalid,
-                                           tready=input_b_tready,
-                                           fifo=input_b_source_queue,
-                                           pause=input_b_source_pause,
-                                           name='input_b_source')
-
-    output_sink = axis_ep.AXIStreamSink(clk,
-                                       rst,
-                                       tdata=output_tdata,
-                                       tvalid=output_tvalid,
-                                       tready=output_tready,
-                                       fifo=output_sink_queue,
-                                       pause=output_sink_pause,
-                                       name='output_sink')
+    input_a_source = axis_ep.AXIStreamSource()
+
+    input_a_source_logic = input_a_source.create_logic(
+        clk,
+        rst,
+        tdata=input_a_tdata,
+        tvalid=input_a_tvalid,
+        tready=input_a_tready,
+        pause=input_a_source_pause,
+        name='input_a_source'
+    )
+
+    input_b_source = axis_ep.AXIStreamSource()
+
+    input_b_source_logic = input_b_source.create_logic(
+        clk,
+        rst,
+        tdata=input_b_tdata,
+        tvalid=input_b_tvalid,
+        tready=input_b_tready,
+        pause=input_b_source_pause,
+        name='input_b_source'
+    )
+
+    output_sink = axis_ep.AXIStreamSink()
+
+    output_sink_logic = output_sink.create_logic(
+        clk,
+        rst,
+        tdata=output_tdata,
+        tvalid=output_tvalid,
+        tready=output_tready,
+        pause=output_sink_pause,
+        name='output_sink'
+    )
 
     # DUT
-    dut = dut_dsp_mult(clk,
-                       rst,
-                       current_test,
-                       input_a_tdata,
-                       input_a_tvalid,
-                       input_a_tready,
-                       input_b_tdata,
-                       input_b_tvalid,
-                       input_b_tready,
-                       output_tdata,
-                       output_tvalid,
-                       output_tready)
+    dut = cosim.dut("test_%s" % module, srcs, params={'WIDTH': WIDTH}, signals=locals())
 
     @always(delay(4))
     def clkgen():
@@ -165,30 +122,34 @@ def bench():
         print("test 1: test multiplier")
         current_test.next = 1
 
-        test_frame1 = axis_ep.AXIStreamFrame()
-        test_frame1.data = [123] + [0]*4
-        test_frame2 = axis_ep.AXIStreamFrame()
-        test_frame2.data = [456] + [0]*4
+        a = [123, 45, 1000, 7]
+        b = [456, 789, 3, 32000]
 
-        input_a_source_queue.put(test_frame1)
-        input_b_source_queue.put(test_frame2)
+        input_a_source.track_times()
+        output_sink.track_times()
 
-        yield clk.posedge
-        yield clk.posedge
-        yield clk.posedge
-        yield clk.posedge
+        # trailing zeros push the products out of the pipeline
+        input_a_source.send(a + [0]*4)
+        input_b_source.send(b + [0]*4)
 
-        while output_sink_queue.empty():
+        while output_sink.count() < 8:
             yield clk.posedge
 
-        yield clk.posedge
-        yield clk.posedge
+        lst = output_sink.read().tolist()
+        ref = [x*y for x, y in zip(a, b)]
 
-        for i in range(4):
-            rx_frame = output_sink_queue.get(False)
+        print(lst)
+        print(ref)
+        i = contains(ref, lst)
+        assert i
 
-        rx_frame = output_sink_queue.get(False)
-        assert rx_frame.data[0] == 123*456
+        # output sample k carries the product of input sample k-depth
+        depth = i[0]
+        lat = axis_ep.measure_latency(input_a_source, output_sink, offset=-depth, period=8)
+        print(lat)
+
+        assert lat.count == 4
+        assert lat.min == lat.max == depth
 
         yield delay(100)
 
@@ -196,6 +157,15 @@ def bench():
 
     return instances()
 
+def contains(small, big):
+    for i in range(len(big)-len(small)+1):
+        for j in range(len(small)):
+            if big[i+j] != small[j]:
+                break
+        else:
+            return i, i+len(small)
+    return False
+
 def test_bench():
     sim = Simulation(bench())
     sim.run()
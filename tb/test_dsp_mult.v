@@ -65,12 +65,13 @@ initial begin
               input_b_tready,
               output_tdata,
               output_tvalid);
-
-    // dump file
-    $dumpfile("test_dsp_mult.lxt");
-    $dumpvars(0, test_dsp_mult);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_dsp_mult
+`include "dump.vh"
+`undef DUMP_TOP
+
 dsp_mult #(
     .WIDTH(WIDTH)
 )
@@ -24,9 +24,9 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
 
 import i2s_ep
+import cosim
 
 module = 'i2s_ctrl'
 
@@ -35,27 +35,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_i2s_ctrl(clk,
-                 rst,
-                 current_test,
-                 sck,
-                 ws,
-                 prescale):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-                sck=sck,
-                ws=ws,
-                prescale=prescale)
-
 def bench():
 
     # Parameters
@@ -83,12 +62,7 @@ def bench():
                                  prescale=prescale)
 
     # DUT
-    dut = dut_i2s_ctrl(clk,
-                       rst,
-                       current_test,
-                       sck,
-                       ws,
-                       prescale)
+    dut = cosim.dut("test_%s" % module, srcs, params={'WIDTH': WIDTH}, signals=locals())
 
     @always(delay(4))
     def clkgen():
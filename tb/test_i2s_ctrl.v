@@ -53,12 +53,13 @@ initial begin
                 prescale);
     $to_myhdl(sck,
               ws);
-
-    // dump file
-    $dumpfile("test_i2s_ctrl.lxt");
-    $dumpvars(0, test_i2s_ctrl);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_i2s_ctrl
+`include "dump.vh"
+`undef DUMP_TOP
+
 i2s_ctrl #(
     .WIDTH(WIDTH)
 )
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2014-2018 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from myhdl import *
+import os
+import shutil
+import tempfile
+import wave
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+import numpy as np
+
+import i2s_ep
+
+def bench():
+
+    # Parameters
+    WIDTH = 16
+
+    # Inputs
+    clk = Signal(bool(0))
+    rst = Signal(bool(0))
+    current_test = Signal(intbv(0)[8:])
+
+    sck = Signal(bool(0))
+    ws = Signal(bool(0))
+    sd = Signal(bool(0))
+
+    # 8 slot TDM, 24 bit samples in 32 bit slots
+    tdm_sck = Signal(bool(0))
+    tdm_ws = Signal(bool(0))
+    tdm_sd = Signal(bool(0))
+
+    # Sources and sinks
+    source_queue = Queue()
+    tdm_queue = Queue()
+    sink_capture = i2s_ep.I2SCapture(chunk_length=16)
+    small_capture = i2s_ep.I2SCapture(np.zeros((4, 2), np.uint16))
+    tdm_capture = i2s_ep.I2SCapture(channels=8)
+
+    tmp = tempfile.mkdtemp()
+
+    # 16 bit stereo clip
+    y_wav = (np.arange(64*2, dtype=np.int16).reshape(-1, 2) - 64) * 311
+
+    wav_name = os.path.join(tmp, 'clip.wav')
+    w = wave.open(wav_name, 'wb')
+    w.setnchannels(2)
+    w.setsampwidth(2)
+    w.setframerate(48000)
+    w.writeframes(y_wav.astype('<i2').tobytes())
+    w.close()
+
+    wav_stream = i2s_ep.PCMStream.from_wav(wav_name)
+
+    # 24 bit, 8 channel clip for TDM
+    y_tdm = np.arange(16*8).reshape(-1, 8) * 0x10101 - 64
+
+    tdm_wav_name = os.path.join(tmp, 'tdm.wav')
+    w = wave.open(tdm_wav_name, 'wb')
+    w.setnchannels(8)
+    w.setsampwidth(3)
+    w.setframerate(48000)
+    w.writeframes(y_tdm.astype('<i4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes())
+    w.close()
+
+    i2s_ctrl = i2s_ep.I2SControl(clk,
+                                 rst,
+                                 sck=sck,
+                                 ws=ws,
+                                 width=WIDTH,
+                                 prescale=2)
+
+    i2s_source = i2s_ep.I2SSource(clk,
+                                  rst,
+                                  sck=sck,
+                                  ws=ws,
+                                  sd=sd,
+                                  width=WIDTH,
+                                  fifo=source_queue,
+                                  name='source')
+
+    i2s_sink = i2s_ep.I2SSink(clk,
+                              rst,
+                              sck=sck,
+                              ws=ws,
+                              sd=sd,
+                              width=WIDTH,
+                              fifo=sink_capture,
+                              name='sink')
+
+    small_sink = i2s_ep.I2SSink(clk,
+                                rst,
+                                sck=sck,
+                                ws=ws,
+                                sd=sd,
+                                width=WIDTH,
+                                fifo=small_capture)
+
+    tdm_ctrl = i2s_ep.I2SControl(clk,
+                                 rst,
+                                 sck=tdm_sck,
+                                 ws=tdm_ws,
+                                 width=32,
+                                 prescale=0,
+                                 slots=8)
+
+    tdm_source = i2s_ep.I2SSource(clk,
+                                  rst,
+                                  sck=tdm_sck,
+                                  ws=tdm_ws,
+                                  sd=tdm_sd,
+                                  width=24,
+                                  fifo=tdm_queue,
+                                  name='tdm_source',
+                                  slots=8,
+                                  slot_width=32)
+
+    tdm_sink = i2s_ep.I2SSink(clk,
+                              rst,
+                              sck=tdm_sck,
+                              ws=tdm_ws,
+                              sd=tdm_sd,
+                              width=24,
+                              fifo=tdm_capture,
+                              name='tdm_sink',
+                              slots=8,
+                              slot_width=32)
+
+    @always(delay(4))
+    def clkgen():
+        clk.next = not clk
+
+    def wait_source(stream):
+        while not source_queue.empty() or not stream.empty():
+            yield clk.posedge
+
+        # let the last frame shift out
+        yield delay(2*WIDTH*2*3*8*2)
+
+    def drain():
+        lst = list(map(tuple, sink_capture.data().tolist()))
+        sink_capture.clear()
+        return lst
+
+    @instance
+    def check():
+        yield delay(100)
+        yield clk.posedge
+        rst.next = 1
+        yield clk.posedge
+        rst.next = 0
+        yield clk.posedge
+        yield delay(100)
+        yield clk.posedge
+
+        # testbench stimulus
+
+        yield clk.posedge
+        print("test 1: tuples")
+        current_test.next = 1
+
+        y = [(k, 4096-k) for k in range(0, 4096, 512)]
+
+        for p in y:
+            source_queue.put(p)
+
+        yield wait_source(i2s_ep.PCMStream(np.zeros((0, 2))))
+
+        lst = drain()
+
+        assert contains(y, lst)
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 2: array")
+        current_test.next = 2
+
+        y = np.stack([np.arange(0, 32), -np.arange(0, 32)], axis=1)
+
+        stream = i2s_ep.PCMStream(y)
+        source_queue.put(stream)
+
+        yield wait_source(stream)
+
+        lst = drain()
+
+        assert contains([tuple(int(v) & 0xffff for v in p) for p in y], lst)
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 3: WAV file")
+        current_test.next = 3
+
+        assert wav_stream.rate == 48000
+        assert len(wav_stream) == len(y_wav)
+        assert isinstance(wav_stream.data, np.memmap)
+
+        source_queue.put(wav_stream)
+
+        yield wait_source(wav_stream)
+
+        lst = drain()
+
+        assert contains([tuple(int(v) & 0xffff for v in p) for p in y_wav], lst)
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 4: frame rate")
+        current_test.next = 4
+
+        sink_capture.clear()
+
+        yield delay(20000)
+
+        # 2 channels, 2 sck edges per bit, prescale 2, 8 ns clock
+        period = 2*WIDTH*2*3*8
+
+        assert len(sink_capture) > 10
+        assert np.all(sink_capture.periods() == period)
+        assert abs(sink_capture.frame_rate() - 1e9/period) < 1e-3
+
+        assert len(small_capture) == 4
+        assert small_capture.dropped > 0
+        assert small_capture.data().base is small_capture.buf
+
+        yield delay(100)
+
+        yield clk.posedge
+        print("test 5: TDM")
+        current_test.next = 5
+
+        # 24 bit samples stay packed in the file until they are sent
+        stream = i2s_ep.PCMStream.from_wav(tdm_wav_name)
+
+        assert isinstance(stream.data, np.memmap)
+        assert len(stream) == len(y_tdm)
+
+        tdm_queue.put(stream)
+
+        while not stream.empty():
+            yield clk.posedge
+
+        # let the last frame shift out
+        yield delay(2*32*8*8*2)
+
+        lst = list(map(tuple, tdm_capture.data().tolist()))
+
+        assert contains([tuple(int(v) & 0xffffff for v in p) for p in y_tdm], lst)
+
+        # 8 slots of 32 bits, 2 sck edges per bit, no prescale, 8 ns clock
+        assert np.all(tdm_capture.periods() == 8*32*2*8)
+
+        yield delay(100)
+
+        shutil.rmtree(tmp)
+
+        raise StopSimulation
+
+    return instances()
+
+def contains(small, big):
+    for i in range(len(big)-len(small)+1):
+        for j in range(len(small)):
+            if big[i+j] != small[j]:
+                break
+        else:
+            return i, i+len(small)
+    return False
+
+def test_bench():
+    sim = Simulation(bench())
+    sim.run()
+
+if __name__ == '__main__':
+    print("Running test...")
+    test_bench()
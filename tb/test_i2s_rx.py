@@ -24,7 +24,6 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
 
 try:
     from queue import Queue
@@ -33,6 +32,7 @@ except ImportError:
 
 import axis_ep
 import i2s_ep
+import cosim
 
 module = 'i2s_rx'
 
@@ -41,41 +41,19 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_i2s_rx(clk,
-               rst,
-               current_test,
-               sck,
-               ws,
-               sd,
-               output_l_tdata,
-               output_r_tdata,
-               output_tvalid,
-               output_tready):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-                sck=sck,
-                ws=ws,
-                sd=sd,
-                output_l_tdata=output_l_tdata,
-                output_r_tdata=output_r_tdata,
-                output_tvalid=output_tvalid,
-                output_tready=output_tready)
-
-def bench():
+# run as separate jobs by run_tests.py
+param_sets = {
+    'stereo': {},
+    # 8 slot TDM, 24 bit samples in 32 bit slots
+    'tdm8': {'WIDTH': 24, 'SLOTS': 8, 'SLOT_WIDTH': 32},
+}
+
+def bench(WIDTH=16, SLOTS=2, SLOT_WIDTH=16):
 
     # Parameters
-    WIDTH = 16
+    PRESCALE = 2
 
-    i2s_ctrl_width = Signal(intbv(WIDTH))
+    i2s_ctrl_width = Signal(intbv(SLOT_WIDTH))
 
     # Inputs
     clk = Signal(bool(0))
@@ -90,11 +68,11 @@ def bench():
     # Outputs
     output_l_tdata = Signal(intbv(0)[WIDTH:])
     output_r_tdata = Signal(intbv(0)[WIDTH:])
+    output_tdata = Signal(intbv(0)[SLOTS*WIDTH:])
     output_tvalid = Signal(bool(0))
 
     # Sources and sinks
     input_source_queue = Queue()
-    output_sink_queue = Queue()
     output_sink_pause = Signal(bool(0))
 
     i2s_ctrl = i2s_ep.I2SControl(clk,
@@ -102,7 +80,8 @@ def bench():
                                  sck=sck,
                                  ws=ws,
                                  width=i2s_ctrl_width,
-                                 prescale=2)
+                                 prescale=PRESCALE,
+                                 slots=SLOTS)
 
     i2s_source = i2s_ep.I2SSource(clk,
                                   rst,
@@ -111,33 +90,39 @@ def bench():
                                   sd=sd,
                                   width=WIDTH,
                                   fifo=input_source_queue,
-                                  name='source')
-
-    output_sink = axis_ep.AXIStreamSink(clk,
-                                        rst,
-                                        tdata=(output_l_tdata, output_r_tdata),
-                                        tvalid=output_tvalid,
-                                        tready=output_tready,
-                                        fifo=output_sink_queue,
-                                        pause=output_sink_pause,
-                                        name='output_sink')
+                                  name='source',
+                                  slots=SLOTS,
+                                  slot_width=SLOT_WIDTH)
+
+    # stereo through the l/r ports, TDM through the slots of output_tdata
+    if SLOTS == 2:
+        output_slots = (output_l_tdata, output_r_tdata)
+    else:
+        output_slots = tuple(output_tdata((k+1)*WIDTH, k*WIDTH) for k in range(SLOTS))
+
+    output_sink = axis_ep.AXIStreamSink()
+
+    output_sink_logic = output_sink.create_logic(
+        clk,
+        rst,
+        tdata=output_slots,
+        tvalid=output_tvalid,
+        tready=output_tready,
+        pause=output_sink_pause,
+        name='output_sink'
+    )
 
     # DUT
-    dut = dut_i2s_rx(clk,
-                     rst,
-                     current_test,
-                     sck,
-                     ws,
-                     sd,
-                     output_l_tdata,
-                     output_r_tdata,
-                     output_tvalid,
-                     output_tready)
+    dut = cosim.dut("test_%s" % module, srcs, params={'WIDTH': WIDTH, 'SLOTS': SLOTS, 'SLOT_WIDTH': SLOT_WIDTH}, signals=locals())
 
     @always(delay(4))
     def clkgen():
         clk.next = not clk
 
+    def frame_time():
+        # 2 sck edges per bit, 8 ns clock
+        return SLOTS*int(i2s_ctrl_width)*2*(PRESCALE+1)*8
+
     @instance
     def check():
         yield delay(100)
@@ -155,9 +140,12 @@ def bench():
         print("test 1: test ramp")
         current_test.next = 1
 
-        y_l = list(range(0,4096,128))
-        y_r = list(range(4096-128,-128,-128))
-        y = list(zip(y_l, y_r))
+        if SLOTS == 2:
+            y_l = list(range(0,4096,128))
+            y_r = list(range(4096-128,-128,-128))
+            y = list(zip(y_l, y_r))
+        else:
+            y = [tuple(((k*SLOTS+j)*40503) & (2**WIDTH-1) for j in range(SLOTS)) for k in range(16)]
 
         for p in y:
             input_source_queue.put(p)
@@ -170,61 +158,52 @@ def bench():
 
         yield clk.posedge
 
-        yield delay(3000)
-
-        lst = []
+        yield delay(2*frame_time())
 
-        while not output_sink_queue.empty():
-            lst += output_sink_queue.get(False).data
-
-        lst = [tuple(p) for p in lst]
+        lst = [tuple(p) for p in output_sink.read().tolist()]
 
         assert contains(y, lst)
 
         yield delay(100)
 
-        yield clk.posedge
-        print("test 2: trailing zeros")
-        current_test.next = 2
-
-        i2s_ctrl_width.next = 24
+        if SLOTS == 2:
+            yield clk.posedge
+            print("test 2: trailing zeros")
+            current_test.next = 2
 
-        yield delay(100)
-        yield clk.posedge
-        rst.next = 1
-        yield clk.posedge
-        rst.next = 0
-        yield clk.posedge
-        yield delay(100)
-        yield clk.posedge
+            i2s_ctrl_width.next = 24
 
-        y_l = list(range(0,4096,128))
-        y_r = list(range(4096-128,-128,-128))
-        y = list(zip(y_l, y_r))
+            yield delay(100)
+            yield clk.posedge
+            rst.next = 1
+            yield clk.posedge
+            rst.next = 0
+            yield clk.posedge
+            yield delay(100)
+            yield clk.posedge
 
-        for p in y:
-            input_source_queue.put(p)
+            y_l = list(range(0,4096,128))
+            y_r = list(range(4096-128,-128,-128))
+            y = list(zip(y_l, y_r))
 
-        yield clk.posedge
-        yield clk.posedge
+            for p in y:
+                input_source_queue.put(p)
 
-        while not input_source_queue.empty():
+            yield clk.posedge
             yield clk.posedge
 
-        yield clk.posedge
-
-        yield delay(5000)
+            while not input_source_queue.empty():
+                yield clk.posedge
 
-        lst = []
+            yield clk.posedge
 
-        while not output_sink_queue.empty():
-            lst += output_sink_queue.get(False).data
+            yield delay(2*frame_time())
 
-        lst = [tuple(p) for p in lst]
+            lst = [tuple(p) for p in output_sink.read().tolist()]
 
-        assert contains(y, lst)
+            assert contains(y, lst)
 
-        yield delay(100)
+            yield delay(100)
 
         raise StopSimulation
 
@@ -239,10 +218,14 @@ def contains(small, big):
             return i, i+len(small)
     return False
 
-def test_bench():
-    sim = Simulation(bench())
+def test_bench(**params):
+    sim = Simulation(bench(**params))
     sim.run()
 
+def test_bench_tdm():
+    test_bench(**param_sets['tdm8'])
+
 if __name__ == '__main__':
-    print("Running test...")
-    test_bench()
+    for name, params in param_sets.items():
+        print("Running test %s..." % name)
+        test_bench(**params)
@@ -33,6 +33,8 @@ module test_i2s_rx;
 
 // Parameters
 parameter WIDTH = 16;
+parameter SLOTS = 2;
+parameter SLOT_WIDTH = WIDTH;
 
 // Inputs
 reg clk = 0;
@@ -47,6 +49,7 @@ reg output_tready = 0;
 // Outputs
 wire [WIDTH-1:0] output_l_tdata;
 wire [WIDTH-1:0] output_r_tdata;
+wire [SLOTS*WIDTH-1:0] output_tdata;
 wire output_tvalid;
 
 initial begin
@@ -60,15 +63,19 @@ initial begin
                 output_tready);
     $to_myhdl(output_l_tdata,
               output_r_tdata,
+              output_tdata,
               output_tvalid);
-
-    // dump file
-    $dumpfile("test_i2s_rx.lxt");
-    $dumpvars(0, test_i2s_rx);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_i2s_rx
+`include "dump.vh"
+`undef DUMP_TOP
+
 i2s_rx #(
-    .WIDTH(WIDTH)
+    .WIDTH(WIDTH),
+    .SLOTS(SLOTS),
+    .SLOT_WIDTH(SLOT_WIDTH)
 )
 UUT (
     .clk(clk),
@@ -78,6 +85,7 @@ UUT (
     .sd(sd),
     .output_l_tdata(output_l_tdata),
     .output_r_tdata(output_r_tdata),
+    .output_tdata(output_tdata),
     .output_tvalid(output_tvalid),
     .output_tready(output_tready)
 );
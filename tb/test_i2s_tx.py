@@ -24,15 +24,10 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
-
-try:
-    from queue import Queue
-except ImportError:
-    from Queue import Queue
 
 import axis_ep
 import i2s_ep
+import cosim
 
 module = 'i2s_tx'
 
@@ -41,49 +36,31 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_i2s_tx(clk,
-               rst,
-               current_test,
-               input_l_tdata,
-               input_r_tdata,
-               input_tvalid,
-               input_tready,
-               sck,
-               ws,
-               sd):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-                input_l_tdata=input_l_tdata,
-                input_r_tdata=input_r_tdata,
-                input_tvalid=input_tvalid,
-                input_tready=input_tready,
-                sck=sck,
-                ws=ws,
-                sd=sd)
-
-def bench():
+# run as separate jobs by run_tests.py
+param_sets = {
+    'stereo': {},
+    # 8 slot TDM, 24 bit samples in 32 bit slots
+    'tdm8': {'WIDTH': 24, 'SLOTS': 8, 'SLOT_WIDTH': 32},
+}
+
+def bench(WIDTH=16, SLOTS=2, SLOT_WIDTH=16):
 
     # Parameters
-    WIDTH = 16
+    PRESCALE = 2
 
-    i2s_ctrl_width = Signal(intbv(WIDTH))
+    i2s_ctrl_width = Signal(intbv(SLOT_WIDTH))
 
     # Inputs
     clk = Signal(bool(0))
     rst = Signal(bool(0))
     current_test = Signal(intbv(0)[8:])
 
-    input_l_tdata = Signal(intbv(0)[WIDTH:])
-    input_r_tdata = Signal(intbv(0)[WIDTH:])
+    # one signal per slot; the l/r ports are slots 0 and 1 and input_tdata
+    # carries all of them, so either input of the DUT sees the same frame
+    input_slot_tdata = [Signal(intbv(0)[WIDTH:]) for k in range(SLOTS)]
+    input_l_tdata = input_slot_tdata[0]
+    input_r_tdata = input_slot_tdata[1]
+    input_tdata = ConcatSignal(*reversed(input_slot_tdata))
     input_tvalid = Signal(bool(0))
     sck = Signal(bool(0))
     ws = Signal(bool(0))
@@ -93,25 +70,28 @@ def bench():
     sd = Signal(bool(0))
 
     # Sources and sinks
-    input_source_queue = Queue()
     input_source_pause = Signal(bool(0))
-    output_sink_queue = Queue()
+    output_sink_capture = i2s_ep.I2SCapture(channels=SLOTS)
 
-    input_source = axis_ep.AXIStreamSource(clk,
-                                           rst,
-                                           tdata=(input_l_tdata, input_r_tdata),
-                                           tvalid=input_tvalid,
-                                           tready=input_tready,
-                                           fifo=input_source_queue,
-                                           pause=input_source_pause,
-                                           name='input_source')
+    input_source = axis_ep.AXIStreamSource()
+
+    input_source_logic = input_source.create_logic(
+        clk,
+        rst,
+        tdata=tuple(input_slot_tdata),
+        tvalid=input_tvalid,
+        tready=input_tready,
+        pause=input_source_pause,
+        name='input_source'
+    )
 
     i2s_ctrl = i2s_ep.I2SControl(clk,
                                  rst,
                                  sck=sck,
                                  ws=ws,
                                  width=i2s_ctrl_width,
-                                 prescale=2)
+                                 prescale=PRESCALE,
+                                 slots=SLOTS)
 
     i2s_sink = i2s_ep.I2SSink(clk,
                               rst,
@@ -119,25 +99,22 @@ def bench():
                               ws=ws,
                               sd=sd,
                               width=WIDTH,
-                              fifo=output_sink_queue,
-                              name='sink')
+                              fifo=output_sink_capture,
+                              name='sink',
+                              slots=SLOTS,
+                              slot_width=SLOT_WIDTH)
 
     # DUT
-    dut = dut_i2s_tx(clk,
-                     rst,
-                     current_test,
-                     input_l_tdata,
-                     input_r_tdata,
-                     input_tvalid,
-                     input_tready,
-                     sck,
-                     ws,
-                     sd)
+    dut = cosim.dut("test_%s" % module, srcs, params={'WIDTH': WIDTH, 'SLOTS': SLOTS, 'SLOT_WIDTH': SLOT_WIDTH}, signals=locals())
 
     @always(delay(4))
     def clkgen():
         clk.next = not clk
 
+    def frame_time():
+        # 2 sck edges per bit, 8 ns clock
+        return SLOTS*int(i2s_ctrl_width)*2*(PRESCALE+1)*8
+
     @instance
     def check():
         yield delay(100)
@@ -155,11 +132,14 @@ def bench():
         print("test 1: test ramp")
         current_test.next = 1
 
-        y_l = list(range(0,4096,128))
-        y_r = list(range(4096-128,-128,-128))
-        y = list(zip(y_l, y_r))
+        if SLOTS == 2:
+            y_l = list(range(0,4096,128))
+            y_r = list(range(4096-128,-128,-128))
+            y = list(zip(y_l, y_r))
+        else:
+            y = [tuple(((k*SLOTS+j)*40503) & (2**WIDTH-1) for j in range(SLOTS)) for k in range(16)]
 
-        input_source_queue.put(y)
+        input_source.send(y)
 
         yield clk.posedge
         yield clk.posedge
@@ -169,56 +149,53 @@ def bench():
 
         yield clk.posedge
 
-        yield delay(3000)
-
-        lst = []
+        yield delay(2*frame_time())
 
-        while not output_sink_queue.empty():
-            lst.append(output_sink_queue.get(False))
+        lst = list(map(tuple, output_sink_capture.data().tolist()))
+        output_sink_capture.clear()
 
         assert contains(y, lst)
 
         yield delay(100)
 
-        yield clk.posedge
-        print("test 2: trailing zeros")
-        current_test.next = 2
-
-        i2s_ctrl_width.next = 24
+        if SLOTS == 2:
+            yield clk.posedge
+            print("test 2: trailing zeros")
+            current_test.next = 2
 
-        yield delay(100)
-        yield clk.posedge
-        rst.next = 1
-        yield clk.posedge
-        rst.next = 0
-        yield clk.posedge
-        yield delay(100)
-        yield clk.posedge
+            i2s_ctrl_width.next = 24
 
-        y_l = list(range(0,4096,128))
-        y_r = list(range(4096-128,-128,-128))
-        y = list(zip(y_l, y_r))
+            yield delay(100)
+            yield clk.posedge
+            rst.next = 1
+            yield clk.posedge
+            rst.next = 0
+            yield clk.posedge
+            yield delay(100)
+            yield clk.posedge
 
-        input_source_queue.put(y)
+            y_l = list(range(0,4096,128))
+            y_r = list(range(4096-128,-128,-128))
+            y = list(zip(y_l, y_r))
 
-        yield clk.posedge
-        yield clk.posedge
+            input_source.send(y)
 
-        while input_tvalid:
+            yield clk.posedge
             yield clk.posedge
 
-        yield clk.posedge
+            while input_tvalid:
+                yield clk.posedge
 
-        yield delay(5000)
+            yield clk.posedge
 
-        lst = []
+            yield delay(2*frame_time())
 
-        while not output_sink_queue.empty():
-            lst.append(output_sink_queue.get(False))
+            lst = list(map(tuple, output_sink_capture.data().tolist()))
+            output_sink_capture.clear()
 
-        assert contains(y, lst)
+            assert contains(y, lst)
 
-        yield delay(100)
+            yield delay(100)
 
         raise StopSimulation
 
@@ -233,10 +210,14 @@ def contains(small, big):
             return i, i+len(small)
     return False
 
-def test_bench():
-    sim = Simulation(bench())
+def test_bench(**params):
+    sim = Simulation(bench(**params))
     sim.run()
 
+def test_bench_tdm():
+    test_bench(**param_sets['tdm8'])
+
 if __name__ == '__main__':
-    print("Running test...")
-    test_bench()
+    for name, params in param_sets.items():
+        print("Running test %s..." % name)
+        test_bench(**params)
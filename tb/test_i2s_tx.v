@@ -33,6 +33,8 @@ module test_i2s_tx;
 
 // Parameters
 parameter WIDTH = 16;
+parameter SLOTS = 2;
+parameter SLOT_WIDTH = WIDTH;
 
 // Inputs
 reg clk = 0;
@@ -41,6 +43,7 @@ reg [7:0] current_test = 0;
 
 reg [WIDTH-1:0] input_l_tdata = 0;
 reg [WIDTH-1:0] input_r_tdata = 0;
+reg [SLOTS*WIDTH-1:0] input_tdata = 0;
 reg input_tvalid = 0;
 reg sck = 0;
 reg ws = 0;
@@ -56,25 +59,30 @@ initial begin
                 current_test,
                 input_l_tdata,
                 input_r_tdata,
+                input_tdata,
                 input_tvalid,
                 sck,
                 ws);
     $to_myhdl(input_tready,
               sd);
-
-    // dump file
-    $dumpfile("test_i2s_tx.lxt");
-    $dumpvars(0, test_i2s_tx);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_i2s_tx
+`include "dump.vh"
+`undef DUMP_TOP
+
 i2s_tx #(
-    .WIDTH(WIDTH)
+    .WIDTH(WIDTH),
+    .SLOTS(SLOTS),
+    .SLOT_WIDTH(SLOT_WIDTH)
 )
 UUT (
     .clk(clk),
     .rst(rst),
     .input_l_tdata(input_l_tdata),
     .input_r_tdata(input_r_tdata),
+    .input_tdata(input_tdata),
     .input_tvalid(input_tvalid),
     .input_tready(input_tready),
     .sck(sck),
@@ -67,12 +67,13 @@ initial begin
               output_i_tdata,
               output_q_tdata,
               output_tvalid);
-
-    // dump file
-    $dumpfile("test_iq_join.lxt");
-    $dumpvars(0, test_iq_join);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_iq_join
+`include "dump.vh"
+`undef DUMP_TOP
+
 iq_join #(
     .WIDTH(WIDTH)
 )
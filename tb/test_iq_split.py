@@ -24,7 +24,6 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
 
 try:
     from queue import Queue
@@ -32,6 +31,7 @@ except ImportError:
     from Queue import Queue
 
 import axis_ep
+import cosim
 
 module = 'iq_split'
 
@@ -40,41 +40,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_iq_split(clk,
-                 rst,
-                 current_test,
-                 input_i_tdata,
-                 input_q_tdata,
-                 input_tvalid,
-                 input_tready,
-                 output_i_tdata,
-                 output_i_tvalid,
-                 output_i_tready,
-                 output_q_tdata,
-                 output_q_tvalid,
-                 output_q_tready):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-                input_i_tdata=input_i_tdata,
-                input_q_tdata=input_q_tdata,
-                input_tvalid=input_tvalid,
-                input_tready=input_tready,
-                output_i_tdata=output_i_tdata,
-                output_i_tvalid=output_i_tvalid,
-                output_i_tready=output_i_tready,
-                output_q_tdata=output_q_tdata,
-                output_q_tvalid=output_q_tvalid,
-                output_q_tready=output_q_tready)
-
 def bench():
 
     # Parameters
@@ -134,19 +99,7 @@ def bench():
                                           name='output_q_sink')
 
     # DUT
-    dut = dut_iq_split(clk,
-                       rst,
-                       current_test,
-                       input_i_tdata,
-                       input_q_tdata,
-                       input_tvalid,
-                       input_tready,
-                       output_i_tdata,
-                       output_i_tvalid,
-                       output_i_tready,
-                       output_q_tdata,
-                       output_q_tvalid,
-                       output_q_tready)
+    dut = cosim.dut("test_%s" % module, srcs, params={'WIDTH': WIDTH}, signals=locals())
 
     @always(delay(4))
     def clkgen():
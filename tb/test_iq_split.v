@@ -67,12 +67,13 @@ initial begin
               output_i_tvalid,
               output_q_tdata,
               output_q_tvalid);
-
-    // dump file
-    $dumpfile("test_iq_split.lxt");
-    $dumpvars(0, test_iq_split);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_iq_split
+`include "dump.vh"
+`undef DUMP_TOP
+
 iq_split #(
     .WIDTH(WIDTH)
 )
@@ -24,7 +24,6 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
 
 try:
     from queue import Queue
@@ -32,6 +31,7 @@ except ImportError:
     from Queue import Queue
 
 import axis_ep
+import cosim
 
 module = 'phase_accumulator'
 
@@ -40,45 +40,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_phase_accumulator(clk,
-                          rst,
-                          current_test,
-
-                          input_phase_tdata,
-                          input_phase_tvalid,
-                          input_phase_tready,
-
-                          input_phase_step_tdata,
-                          input_phase_step_tvalid,
-                          input_phase_step_tready,
-
-                          output_phase_tdata,
-                          output_phase_tvalid,
-                          output_phase_tready):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-
-                input_phase_tdata=input_phase_tdata,
-                input_phase_tvalid=input_phase_tvalid,
-                input_phase_tready=input_phase_tready,
-
-                input_phase_step_tdata=input_phase_step_tdata,
-                input_phase_step_tvalid=input_phase_step_tvalid,
-                input_phase_step_tready=input_phase_step_tready,
-
-                output_phase_tdata=output_phase_tdata,
-                output_phase_tvalid=output_phase_tvalid,
-                output_phase_tready=output_phase_tready)
-
 def bench():
 
     # Parameters
@@ -139,21 +100,7 @@ def bench():
                                        name='phase_sink')
 
     # DUT
-    dut = dut_phase_accumulator(clk,
-                                rst,
-                                current_test,
-
-                                input_phase_tdata,
-                                input_phase_tvalid,
-                                input_phase_tready,
-
-                                input_phase_step_tdata,
-                                input_phase_step_tvalid,
-                                input_phase_step_tready,
-
-                                output_phase_tdata,
-                                output_phase_tvalid,
-                                output_phase_tready)
+    dut = cosim.dut("test_%s" % module, srcs, params={'WIDTH': WIDTH, 'INITIAL_PHASE': INITIAL_PHASE, 'INITIAL_PHASE_STEP': INITIAL_PHASE_STEP}, signals=locals())
 
     @always(delay(4))
     def clkgen():
@@ -67,12 +67,13 @@ initial begin
               input_phase_step_tready,
               output_phase_tdata,
               output_phase_tvalid);
-
-    // dump file
-    $dumpfile("test_phase_accumulator.lxt");
-    $dumpvars(0, test_phase_accumulator);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_phase_accumulator
+`include "dump.vh"
+`undef DUMP_TOP
+
 phase_accumulator #(
     .WIDTH(WIDTH),
     .INITIAL_PHASE(INITIAL_PHASE),
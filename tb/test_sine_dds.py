@@ -24,16 +24,11 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
-
-try:
-    from queue import Queue
-except ImportError:
-    from Queue import Queue
 
 import numpy as np
 
 import axis_ep
+import cosim
 
 module = 'sine_dds'
 
@@ -44,47 +39,6 @@ srcs.append("../rtl/phase_accumulator.v")
 srcs.append("../rtl/sine_dds_lut.v")
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_sine_dds(clk,
-                 rst,
-                 current_test,
-
-                 input_phase_tdata,
-                 input_phase_tvalid,
-                 input_phase_tready,
-
-                 input_phase_step_tdata,
-                 input_phase_step_tvalid,
-                 input_phase_step_tready,
-
-                 output_sample_i_tdata,
-                 output_sample_q_tdata,
-                 output_sample_tvalid,
-                 output_sample_tready):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-
-                input_phase_tdata=input_phase_tdata,
-                input_phase_tvalid=input_phase_tvalid,
-                input_phase_tready=input_phase_tready,
-
-                input_phase_step_tdata=input_phase_step_tdata,
-                input_phase_step_tvalid=input_phase_step_tvalid,
-                input_phase_step_tready=input_phase_step_tready,
-
-                output_sample_i_tdata=output_sample_i_tdata,
-                output_sample_q_tdata=output_sample_q_tdata,
-                output_sample_tvalid=output_sample_tvalid,
-                output_sample_tready=output_sample_tready)
-
 def bench():
 
     # Parameters
@@ -112,62 +66,74 @@ def bench():
     output_sample_tvalid = Signal(bool(1))
 
     # sources and sinks
-    phase_source_queue = Queue()
     phase_source_pause = Signal(bool(0))
-    phase_step_source_queue = Queue()
     phase_step_source_pause = Signal(bool(0))
-    sample_sink_queue = Queue()
     sample_sink_pause = Signal(bool(0))
 
-    phase_source = axis_ep.AXIStreamSource(clk,
-                                           rst,
-                                           tdata=input_phase_tdata,
-                                           tvalid=input_phase_tvalid,
-                                           tready=input_phase_tready,
-                                           fifo=phase_source_queue,
-                                           pause=phase_source_pause,
-                                           name='phase_source')
-
-    phase_step_source = axis_ep.AXIStreamSource(clk,
-                                                rst,
-                                                tdata=input_phase_step_tdata,
-                                                tvalid=input_phase_step_tvalid,
-                                                tready=input_phase_step_tready,
-                                                fifo=phase_step_source_queue,
-                                                pause=phase_step_source_pause,
-                                                name='phase_step_source')
-
-    sample_sink = axis_ep.AXIStreamSink(clk,
-                                        rst,
-                                        tdata=(output_sample_i_tdata, output_sample_q_tdata),
-                                        tvalid=output_sample_tvalid,
-                                        tready=output_sample_tready,
-                                        fifo=sample_sink_queue,
-                                        pause=sample_sink_pause,
-                                        name='sample_sink')
+    phase_source = axis_ep.AXIStreamSource()
+
+    phase_source_logic = phase_source.create_logic(
+        clk,
+        rst,
+        tdata=input_phase_tdata,
+        tvalid=input_phase_tvalid,
+        tready=input_phase_tready,
+        pause=phase_source_pause,
+        name='phase_source'
+    )
+
+    phase_step_source = axis_ep.AXIStreamSource()
+
+    phase_step_source_logic = phase_step_source.create_logic(
+        clk,
+        rst,
+        tdata=input_phase_step_tdata,
+        tvalid=input_phase_step_tvalid,
+        tready=input_phase_step_tready,
+        pause=phase_step_source_pause,
+        name='phase_step_source'
+    )
+
+    sample_sink = axis_ep.AXIStreamSink()
+
+    sample_sink_logic = sample_sink.create_logic(
+        clk,
+        rst,
+        tdata=(output_sample_i_tdata, output_sample_q_tdata),
+        tvalid=output_sample_tvalid,
+        tready=output_sample_tready,
+        pause=sample_sink_pause,
+        signed=True,
+        name='sample_sink'
+    )
 
     # DUT
-    dut = dut_sine_dds(clk,
-                       rst,
-                       current_test,
-
-                       input_phase_tdata,
-                       input_phase_tvalid,
-                       input_phase_tready,
-
-                       input_phase_step_tdata,
-                       input_phase_step_tvalid,
-                       input_phase_step_tready,
-
-                       output_sample_i_tdata,
-                       output_sample_q_tdata,
-                       output_sample_tvalid,
-                       output_sample_tready)
+    dut = cosim.dut("test_%s" % module, srcs, params={'PHASE_WIDTH': PHASE_WIDTH, 'OUTPUT_WIDTH': OUTPUT_WIDTH, 'INITIAL_PHASE': INITIAL_PHASE, 'INITIAL_PHASE_STEP': INITIAL_PHASE_STEP}, signals=locals())
 
     @always(delay(4))
     def clkgen():
         clk.next = not clk
 
+    def ref_samples(fcw, offset, n):
+        # reference cosine and sine of the first n samples
+        INPUT_WIDTH = OUTPUT_WIDTH+2
+        x = np.array([int((fcw*j + offset) / 2**(PHASE_WIDTH-INPUT_WIDTH)) for j in range(n)])
+        a = 2*np.pi*(x-2**((INPUT_WIDTH-2)/2-1))/2**INPUT_WIDTH
+        return np.stack([np.cos(a), np.sin(a)], axis=1)*(2**(OUTPUT_WIDTH-1)-1)
+
+    def find_samples(lst, ref):
+        # index of the first run of received samples within two counts of ref
+        ref = ref.astype(np.int64)
+
+        for i in range(len(lst)-len(ref)+1):
+            if np.all(np.abs(lst[i:i+len(ref)]-ref) <= 2):
+                return i
+        return None
+
+    def phase_latency(i):
+        # cycles from the phase beat to received sample i
+        return (sample_sink.times.sample_times()[i] - phase_source.times.beat[0]) // 8
+
     @instance
     def check():
         yield delay(100)
@@ -188,44 +154,23 @@ def bench():
         fcw = int(2**PHASE_WIDTH / 100)
         offset = 0
 
-        test_frame1 = axis_ep.AXIStreamFrame()
-        test_frame1.data = [offset]
-        test_frame2 = axis_ep.AXIStreamFrame()
-        test_frame2.data = [fcw]
+        sample_sink.read()
+        phase_source.track_times()
+        sample_sink.track_times()
 
-        phase_source_queue.put(test_frame1)
-        phase_step_source_queue.put(test_frame2)
-
-        yield clk.posedge
-        yield clk.posedge
-
-        while not sample_sink_queue.empty():
-            sample_sink_queue.get(False)
+        phase_source.send([offset])
+        phase_step_source.send([fcw])
 
         yield delay(1000)
 
-        for j in range(6):
-            sample_sink_queue.get(False)
-
-        for j in range(100):
-            rx_frame = sample_sink_queue.get(False)
-            INPUT_WIDTH = OUTPUT_WIDTH+2
-            x = int((fcw*j + offset) / 2**(PHASE_WIDTH-INPUT_WIDTH))
-            c, s = rx_frame.data[0]
+        lst = sample_sink.read()
+        i = find_samples(lst, ref_samples(fcw, offset, 100))
+        assert i is not None
 
-            # sign bit
-            if c >= 2**(OUTPUT_WIDTH-1):
-                c -= 2**OUTPUT_WIDTH
-            if s >= 2**(OUTPUT_WIDTH-1):
-                s -= 2**OUTPUT_WIDTH
+        lat = phase_latency(i)
+        print("latency %d cycles" % lat)
 
-            # reference sine and cosine
-            rc = int(np.cos(2*np.pi*(x-2**((INPUT_WIDTH-2)/2-1))/2**INPUT_WIDTH)*(2**(OUTPUT_WIDTH-1)-1))
-            rs = int(np.sin(2*np.pi*(x-2**((INPUT_WIDTH-2)/2-1))/2**INPUT_WIDTH)*(2**(OUTPUT_WIDTH-1)-1))
-
-            # assert error of two counts or less
-            assert abs(c-rc) <= 2
-            assert abs(s-rs) <= 2
+        latency = lat
 
         yield clk.posedge
         print("test 2: low frequency")
@@ -234,44 +179,23 @@ def bench():
         fcw = int(2**PHASE_WIDTH / 10000)
         offset = 0
 
-        test_frame1 = axis_ep.AXIStreamFrame()
-        test_frame1.data = [offset]
-        test_frame2 = axis_ep.AXIStreamFrame()
-        test_frame2.data = [fcw]
-
-        phase_source_queue.put(test_frame1)
-        phase_step_source_queue.put(test_frame2)
-
-        yield clk.posedge
-        yield clk.posedge
+        sample_sink.read()
+        phase_source.track_times()
+        sample_sink.track_times()
 
-        while not sample_sink_queue.empty():
-            sample_sink_queue.get(False)
+        phase_source.send([offset])
+        phase_step_source.send([fcw])
 
         yield delay(1000)
 
-        for j in range(6):
-            sample_sink_queue.get(False)
-
-        for j in range(100):
-            rx_frame = sample_sink_queue.get(False)
-            INPUT_WIDTH = OUTPUT_WIDTH+2
-            x = int((fcw*j + offset) / 2**(PHASE_WIDTH-INPUT_WIDTH))
-            c, s = rx_frame.data[0]
-
-            # sign bit
-            if c >= 2**(OUTPUT_WIDTH-1):
-                c -= 2**OUTPUT_WIDTH
-            if s >= 2**(OUTPUT_WIDTH-1):
-                s -= 2**OUTPUT_WIDTH
+        lst = sample_sink.read()
+        i = find_samples(lst, ref_samples(fcw, offset, 100))
+        assert i is not None
 
-            # reference sine and cosine
-            rc = int(np.cos(2*np.pi*(x-2**((INPUT_WIDTH-2)/2-1))/2**INPUT_WIDTH)*(2**(OUTPUT_WIDTH-1)-1))
-            rs = int(np.sin(2*np.pi*(x-2**((INPUT_WIDTH-2)/2-1))/2**INPUT_WIDTH)*(2**(OUTPUT_WIDTH-1)-1))
+        lat = phase_latency(i)
+        print("latency %d cycles" % lat)
 
-            # assert error of two counts or less
-            assert abs(c-rc) <= 2
-            assert abs(s-rs) <= 2
+        assert lat == latency
 
         yield clk.posedge
         print("test 3: phase offset")
@@ -280,44 +204,23 @@ def bench():
         fcw = int(2**PHASE_WIDTH / 10000)
         offset = 2**(PHASE_WIDTH-2)
 
-        test_frame1 = axis_ep.AXIStreamFrame()
-        test_frame1.data = [offset]
-        test_frame2 = axis_ep.AXIStreamFrame()
-        test_frame2.data = [fcw]
+        sample_sink.read()
+        phase_source.track_times()
+        sample_sink.track_times()
 
-        phase_source_queue.put(test_frame1)
-        phase_step_source_queue.put(test_frame2)
-
-        yield clk.posedge
-        yield clk.posedge
-
-        while not sample_sink_queue.empty():
-            sample_sink_queue.get(False)
+        phase_source.send([offset])
+        phase_step_source.send([fcw])
 
         yield delay(1000)
 
-        for j in range(6):
-            sample_sink_queue.get(False)
-
-        for j in range(100):
-            rx_frame = sample_sink_queue.get(False)
-            INPUT_WIDTH = OUTPUT_WIDTH+2
-            x = int((fcw*j + offset) / 2**(PHASE_WIDTH-INPUT_WIDTH))
-            c, s = rx_frame.data[0]
-
-            # sign bit
-            if c >= 2**(OUTPUT_WIDTH-1):
-                c -= 2**OUTPUT_WIDTH
-            if s >= 2**(OUTPUT_WIDTH-1):
-                s -= 2**OUTPUT_WIDTH
+        lst = sample_sink.read()
+        i = find_samples(lst, ref_samples(fcw, offset, 100))
+        assert i is not None
 
-            # reference sine and cosine
-            rc = int(np.cos(2*np.pi*(x-2**((INPUT_WIDTH-2)/2-1))/2**INPUT_WIDTH)*(2**(OUTPUT_WIDTH-1)-1))
-            rs = int(np.sin(2*np.pi*(x-2**((INPUT_WIDTH-2)/2-1))/2**INPUT_WIDTH)*(2**(OUTPUT_WIDTH-1)-1))
+        lat = phase_latency(i)
+        print("latency %d cycles" % lat)
 
-            # assert error of two counts or less
-            assert abs(c-rc) <= 2
-            assert abs(s-rs) <= 2
+        assert lat == latency
 
         raise StopSimulation
 
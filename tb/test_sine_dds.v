@@ -70,12 +70,13 @@ initial begin
               output_sample_i_tdata,
               output_sample_q_tdata,
               output_sample_tvalid);
-
-    // dump file
-    $dumpfile("test_sine_dds.lxt");
-    $dumpvars(0, test_sine_dds);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_sine_dds
+`include "dump.vh"
+`undef DUMP_TOP
+
 sine_dds #(
     .PHASE_WIDTH(PHASE_WIDTH),
     .OUTPUT_WIDTH(OUTPUT_WIDTH),
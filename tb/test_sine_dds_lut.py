@@ -24,7 +24,6 @@ THE SOFTWARE.
 """
 
 from myhdl import *
-import os
 
 try:
     from queue import Queue
@@ -34,6 +33,7 @@ except ImportError:
 import numpy as np
 
 import axis_ep
+import cosim
 
 module = 'sine_dds_lut'
 
@@ -42,39 +42,6 @@ srcs = []
 srcs.append("../rtl/%s.v" % module)
 srcs.append("test_%s.v" % module)
 
-src = ' '.join(srcs)
-
-build_cmd = "iverilog -o test_%s.vvp %s" % (module, src)
-
-def dut_sine_dds_lut(clk,
-                     rst,
-                     current_test,
-
-                     input_phase_tdata,
-                     input_phase_tvalid,
-                     input_phase_tready,
-
-                     output_sample_i_tdata,
-                     output_sample_q_tdata,
-                     output_sample_tvalid,
-                     output_sample_tready):
-
-    if os.system(build_cmd):
-        raise Exception("Error running build command")
-    return Cosimulation("vvp -m myhdl test_%s.vvp -lxt2" % module,
-                clk=clk,
-                rst=rst,
-                current_test=current_test,
-
-                input_phase_tdata=input_phase_tdata,
-                input_phase_tvalid=input_phase_tvalid,
-                input_phase_tready=input_phase_tready,
-
-                output_sample_i_tdata=output_sample_i_tdata,
-                output_sample_q_tdata=output_sample_q_tdata,
-                output_sample_tvalid=output_sample_tvalid,
-                output_sample_tready=output_sample_tready)
-
 def bench():
 
     # Parameters
@@ -121,18 +88,7 @@ def bench():
                                         name='sample_sink')
 
     # DUT
-    dut = dut_sine_dds_lut(clk,
-                           rst,
-                           current_test,
-
-                           input_phase_tdata,
-                           input_phase_tvalid,
-                           input_phase_tready,
-
-                           output_sample_i_tdata,
-                           output_sample_q_tdata,
-                           output_sample_tvalid,
-                           output_sample_tready)
+    dut = cosim.dut("test_%s" % module, srcs, params={'OUTPUT_WIDTH': OUTPUT_WIDTH}, signals=locals())
 
     @always(delay(4))
     def clkgen():
@@ -62,12 +62,13 @@ initial begin
               output_sample_i_tdata,
               output_sample_q_tdata,
               output_sample_tvalid);
-
-    // dump file
-    $dumpfile("test_sine_dds_lut.lxt");
-    $dumpvars(0, test_sine_dds_lut);
 end
 
+// waveform dump, off unless enabled with +dump
+`define DUMP_TOP test_sine_dds_lut
+`include "dump.vh"
+`undef DUMP_TOP
+
 sine_dds_lut #(
     .OUTPUT_WIDTH(OUTPUT_WIDTH),
     .INPUT_WIDTH(INPUT_WIDTH)